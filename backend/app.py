@@ -1,13 +1,25 @@
 """main flask application with SocketIO"""
 
-from flask import Flask, render_template, jsonify, request
-from flask_socketio import SocketIO, emit
+from flask import Flask, render_template, jsonify, request, Response
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
 import eventlet
+import hmac
+import math
+import time
+from functools import wraps
 
 from config import Config
 from serial_handler import SerialHandler, SensorData
 from data_logger import DataLogger
+from ingest_server import IngestServer
+import payloads
+from payloads import FORMAT_JSON, FORMAT_BINARY
+from derived import DerivedChannels
+from filters import ChannelFilters
+import profiler
+import session_compare
+import segments
 
 # Monkey patch for eventlet
 eventlet.monkey_patch()
@@ -23,9 +35,16 @@ app.config.from_object(Config)
 CORS(app)
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
 
+# Filters and derived channels are compiled once; each stream keeps its own state
+channel_filters = ChannelFilters(Config.FILTERS, payloads.CHANNELS)
+derived_channels = DerivedChannels(Config.DERIVED_CHANNELS, payloads.CHANNELS + channel_filters.names)
+STREAM_CHANNELS = payloads.CHANNELS + channel_filters.names + derived_channels.names
+filter_pipelines = {}  # vehicle_id (None for the serial stream) -> FilterPipeline
+derived_evaluators = {}  # vehicle_id (None for the serial stream) -> DerivedEvaluator
+
 # Initialize handlers
 serial_handler = SerialHandler(Config.SERIAL_PORT, Config.SERIAL_BAUD)
-data_logger = DataLogger(Config.LOG_DIRECTORY)
+data_logger = DataLogger(Config.LOG_DIRECTORY, STREAM_CHANNELS)
 
 # Global state
 system_status = {
@@ -33,20 +52,76 @@ system_status = {
     'streaming': False,
     'logging': False
 }
+session_name = 'session'
+vehicle_loggers = {}  # vehicle_id -> DataLogger for remote loggers
+clients = {}  # sid -> {'format': payload format, 'local': gets the serial stream, 'vehicles': set of vehicle ids}
+segment_thresholds = segments.Thresholds(**Config.SEGMENT_THRESHOLDS)
+segment_index = segments.SegmentIndex(Config.LOG_DIRECTORY)
+reindex_status = {'running': False, 'pending': 0, 'indexed': 0, 'failed': 0}
+
+def stream_room(fmt: str, vehicle_id: str = None) -> str:
+    """Room for the local stream, or a remote vehicle, in one payload format"""
+    if vehicle_id is None:
+        return f'stream:{fmt}'
+    return f'vehicle:{vehicle_id}:{fmt}'
+
+def has_subscribers(fmt: str, vehicle_id: str = None) -> bool:
+    """Skip encoding payloads nobody will receive"""
+    return any(c['format'] == fmt and (c['local'] if vehicle_id is None else vehicle_id in c['vehicles'])
+               for c in list(clients.values()))
+
+def process_batch(vehicle_id, samples):
+    """Columns for a batch of samples, including filtered and derived channels"""
+    times, columns = payloads.columns_from_samples(samples)
+    pipeline = filter_pipelines.get(vehicle_id)
+    if pipeline is None:
+        pipeline = filter_pipelines[vehicle_id] = channel_filters.pipeline()
+    columns.update(pipeline.apply(times, columns))
+    evaluator = derived_evaluators.get(vehicle_id)
+    if evaluator is None:
+        evaluator = derived_evaluators[vehicle_id] = derived_channels.evaluator()
+    columns.update(evaluator.evaluate(times, columns))
+    return times, columns
 
 def broadcast_data(data: SensorData):
     """Broadcast sensor data to all connected clients"""
-    socketio.emit('sensor_data', {
-        'timestamp': data.timestamp,
-        'coolant_temp': data.coolant_temp,
-        'oil_temp': data.oil_temp,
-        'oil_pressure': data.oil_pressure,
-        'throttle_position': data.throttle_position
-    })
+    times, columns = process_batch(None, [data])
+    
+    if has_subscribers(FORMAT_JSON):
+        socketio.emit('sensor_data', payloads.to_json(times, columns, STREAM_CHANNELS)[0],
+                      to=stream_room(FORMAT_JSON))
+    if has_subscribers(FORMAT_BINARY):
+        socketio.emit('sensor_frame', payloads.pack_frame(times, columns, STREAM_CHANNELS),
+                      to=stream_room(FORMAT_BINARY))
     
     # Log if enabled
     if system_status['logging']:
-        data_logger.log_data(data)
+        data_logger.log_batch(times, columns)
+
+def broadcast_batch(vehicle_id: str, samples):
+    """Broadcast a batch from a remote logger to its vehicle room"""
+    times, columns = process_batch(vehicle_id, samples)
+    
+    if has_subscribers(FORMAT_JSON, vehicle_id):
+        socketio.emit('sensor_batch', {
+            'vehicle_id': vehicle_id,
+            'samples': payloads.to_json(times, columns, STREAM_CHANNELS)
+        }, to=stream_room(FORMAT_JSON, vehicle_id))
+    if has_subscribers(FORMAT_BINARY, vehicle_id):
+        socketio.emit('sensor_batch', {
+            'vehicle_id': vehicle_id,
+            'frame': payloads.pack_frame(times, columns, STREAM_CHANNELS)
+        }, to=stream_room(FORMAT_BINARY, vehicle_id))
+    
+    if system_status['logging']:
+        logger = vehicle_loggers.get(vehicle_id)
+        if logger is None:
+            logger = vehicle_loggers[vehicle_id] = DataLogger(Config.LOG_DIRECTORY, STREAM_CHANNELS)
+            logger.start_logging(f'{session_name}_{vehicle_id}')
+        logger.log_batch(times, columns)
+
+ingest_server = IngestServer(Config.INGEST_HOST, Config.INGEST_PORT, broadcast_batch)
+debug_profiler = profiler.SamplingProfiler(Config.PROFILE_INTERVAL)
 
 # Routes
 @app.route('/')
@@ -95,6 +170,7 @@ def stop_streaming():
 @app.route('/api/logging/start', methods=['POST'])
 def start_logging():
     """Start data logging"""
+    global session_name
     data = request.get_json() or {}
     session_name = data.get('session_name', 'session')
     
@@ -105,21 +181,231 @@ def start_logging():
 @app.route('/api/logging/stop', methods=['POST'])
 def stop_logging():
     """Stop data logging"""
-    data_logger.stop_logging()
     system_status['logging'] = False
+    paths = [data_logger.stop_logging()]
+    for logger in vehicle_loggers.values():
+        paths.append(logger.stop_logging())
+    vehicle_loggers.clear()
+    socketio.start_background_task(index_sessions, [p for p in paths if p])
     return jsonify({'success': True, 'message': 'Logging stopped'})
 
+def index_sessions(paths, status=None):
+    """Build drive-phase indexes in a background task
+
+    Parsing runs on the hub thread, so yield between sessions to keep the
+    serial reader and Socket.IO responsive.
+    """
+    for path in paths:
+        try:
+            segments.index_session(path, segment_thresholds)
+            if status is not None:
+                status['indexed'] += 1
+        except Exception as e:
+            print(f"[WARNING] Could not segment {path.name}: {e}")
+            if status is not None:
+                status['failed'] += 1
+        if status is not None:
+            status['pending'] -= 1
+        socketio.sleep(0)
+
+@app.route('/api/vehicles')
+def get_vehicles():
+    """Remote loggers seen by the ingest server"""
+    return jsonify(ingest_server.status())
+
+@app.route('/api/sessions')
+def get_sessions():
+    """Logged sessions in the log directory"""
+    return jsonify(session_compare.list_sessions(Config.LOG_DIRECTORY))
+
+@app.route('/api/compare')
+def compare_sessions():
+    """Overlay two sessions: /api/compare?a=<session>&b=<session>&align=start|event|throttle_xcorr"""
+    args = request.args
+    channels = [c for c in args.get('channels', '').split(',') if c] or session_compare.DEFAULT_CHANNELS
+    try:
+        result = session_compare.compare_sessions(
+            Config.LOG_DIRECTORY, args.get('a', ''), args.get('b', ''),
+            align=args.get('align', 'start'),
+            channels=channels,
+            event=args.get('event', session_compare.DEFAULT_EVENT),
+            rate_hz=Config.SAMPLE_RATE_HZ,
+            points=args.get('points', 1000, type=int))
+    except session_compare.SessionNotFound as e:
+        return jsonify({'success': False, 'message': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify(result)
+
+@app.route('/api/segments')
+def get_segments():
+    """Query drive-phase segments across all sessions, e.g.
+    /api/segments?phase=wot&min_duration=3&where=oil_temp_max>110
+    """
+    args = request.args
+    try:
+        result = segment_index.query(
+            phase=args.get('phase') or None,
+            min_duration=args.get('min_duration', type=float),
+            max_duration=args.get('max_duration', type=float),
+            session=args.get('session') or None,
+            where=args.getlist('where'),
+            limit=args.get('limit', 1000, type=int))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'count': len(result), 'segments': result})
+
+@app.route('/api/segments/reindex', methods=['POST'])
+def reindex_segments():
+    """Index logged sessions that have no (or an outdated) segment index, in the background"""
+    if reindex_status['running']:
+        return jsonify({'success': False, 'message': 'Reindex already running', **reindex_status}), 409
+    data = request.get_json(silent=True) or {}
+    paths = segments.stale_sessions(Config.LOG_DIRECTORY, bool(data.get('force')))
+    reindex_status.update(running=True, pending=len(paths), indexed=0, failed=0)
+    
+    def run():
+        try:
+            index_sessions(paths, reindex_status)
+        finally:
+            reindex_status['running'] = False
+    
+    socketio.start_background_task(run)
+    return jsonify({'success': True, 'queued': len(paths)}), 202
+
+@app.route('/api/segments/reindex')
+def get_reindex_status():
+    """Progress of the last reindex"""
+    return jsonify(reindex_status)
+
+# Debug endpoints
+def require_debug_token(f):
+    """Allow only requests carrying Config.DEBUG_TOKEN"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if not Config.DEBUG_TOKEN:
+            return jsonify({'success': False, 'message': 'Debug endpoints disabled (set DEBUG_TOKEN)'}), 403
+        # header only: query strings end up in the access log
+        token = request.headers.get('X-Debug-Token', '')
+        # bytes: compare_digest rejects non-ASCII str
+        if not hmac.compare_digest(token.encode(), Config.DEBUG_TOKEN.encode()):
+            return jsonify({'success': False, 'message': 'Invalid debug token'}), 401
+        return f(*args, **kwargs)
+    return wrapper
+
+def debug_seconds(default: float) -> float:
+    seconds = request.args.get('seconds', default, type=float)
+    if not math.isfinite(seconds):
+        raise ValueError("seconds must be a finite number")
+    return min(max(seconds, 0.1), Config.PROFILE_MAX_SECONDS)
+
+@app.route('/api/debug/profile')
+@require_debug_token
+def debug_profile():
+    """Sample all thread stacks for N seconds, return collapsed stacks"""
+    try:
+        seconds = debug_seconds(10)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    sampler = debug_profiler
+    try:
+        sampler.start()
+    except RuntimeError as e:
+        return jsonify({'success': False, 'message': str(e)}), 409
+    
+    # yield to other greenlets while the sampler thread runs; always stop it,
+    # even if this greenlet is killed, or every later request gets 409
+    try:
+        socketio.sleep(seconds)
+    finally:
+        sampler.stop()
+    
+    if request.args.get('format') == 'json':
+        return jsonify(sampler.summary(request.args.get('top', 50, type=int)))
+    filename = f"profile_{int(time.time())}.collapsed"
+    return Response(sampler.collapsed(), mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@app.route('/api/debug/snapshot')
+@require_debug_token
+def debug_snapshot():
+    """Per-thread CPU time and top tracemalloc allocations"""
+    try:
+        seconds = debug_seconds(5)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    started = profiler.start_tracemalloc()
+    try:
+        if started:
+            # only allocations made while tracing are visible
+            socketio.sleep(seconds)
+        # snapshot first so tracing is switched off again before anything else can fail
+        memory = profiler.top_allocations(request.args.get('top', 20, type=int), stop=started)
+    finally:
+        if started:
+            profiler.stop_tracemalloc()
+    return jsonify({
+        'process_cpu_seconds': round(time.process_time(), 4),
+        'threads': profiler.thread_cpu_times(),
+        'memory': memory
+    })
+
 # SocketIO events
 @socketio.on('connect')
 def handle_connect():
     """Client connected"""
     print('Client connected')
+    clients[request.sid] = {'format': FORMAT_JSON, 'local': True, 'vehicles': set()}
+    join_room(stream_room(FORMAT_JSON))
     emit('status', system_status)
+    emit('schema', payloads.schema(STREAM_CHANNELS, Config.DERIVED_UNITS))
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Client disconnected"""
     print('Client disconnected')
+    clients.pop(request.sid, None)
+
+@socketio.on('set_format')
+def handle_set_format(fmt):
+    """Switch client between JSON and binary sensor payloads"""
+    client = clients.get(request.sid)
+    if client is None or fmt not in (FORMAT_JSON, FORMAT_BINARY) or fmt == client['format']:
+        return
+    
+    old = client['format']
+    if client['local']:
+        leave_room(stream_room(old))
+        join_room(stream_room(fmt))
+    for vehicle_id in client['vehicles']:
+        leave_room(stream_room(old, vehicle_id))
+        join_room(stream_room(fmt, vehicle_id))
+    client['format'] = fmt
+
+@socketio.on('join_vehicle')
+def handle_join_vehicle(vehicle_id):
+    """Subscribe client to a remote vehicle's data instead of the serial stream"""
+    client = clients.get(request.sid)
+    if client is None:
+        return
+    if client['local']:
+        # different time base, don't mix it into the vehicle's trace
+        leave_room(stream_room(client['format']))
+        client['local'] = False
+    client['vehicles'].add(str(vehicle_id))
+    join_room(stream_room(client['format'], str(vehicle_id)))
+
+@socketio.on('leave_vehicle')
+def handle_leave_vehicle(vehicle_id):
+    """Unsubscribe client from a remote vehicle's data"""
+    client = clients.get(request.sid)
+    if client is None:
+        return
+    client['vehicles'].discard(str(vehicle_id))
+    leave_room(stream_room(client['format'], str(vehicle_id)))
+    if not client['vehicles'] and not client['local']:
+        join_room(stream_room(client['format']))
+        client['local'] = True
 
 if __name__ == '__main__':
     print("=" * 50)
@@ -129,4 +415,7 @@ if __name__ == '__main__':
     print(f"Dashboard: http://localhost:5000")
     print("=" * 50)
     
+    if Config.INGEST_ENABLED:
+        ingest_server.start()
+    
     socketio.run(app, host='0.0.0.0', port=5000, debug=Config.DEBUG)
\ No newline at end of file
@@ -46,6 +46,56 @@ class Config:
     ALERT_OIL_TEMP = 120.0       # °C
     ALERT_OIL_PRESSURE_MIN = 20.0  # PSI
     
+    # host-side filters: channel -> chain of filters, published as '<channel>_filtered'
+    # next to the raw value (see filters.py)
+    FILTERS = {
+        'oil_pressure': [
+            {'type': 'median', 'n': 5},                                     # ignition spikes
+            {'type': 'kalman', 'process_noise': 20.0, 'measurement_noise': 2.0},  # PSI^2/s, PSI^2
+        ],
+        'coolant_temp': [{'type': 'iir', 'tau': 2.0}],                      # s
+        'oil_temp': [{'type': 'iir', 'tau': 2.0}],                          # s
+        'throttle_position': [{'type': 'median', 'n': 3}],
+    }
+    
+    # derived channels: name -> expression over sensor (and filtered) channels (see derived.py)
+    DERIVED_CHANNELS = {
+        'coolant_rate': 'ddt(ema(coolant_temp, 3))',             # °C/s
+        'oil_temp_rate': 'ddt(ema(oil_temp, 3))',                # °C/s
+        'oil_coolant_delta': 'oil_temp - coolant_temp',          # °C
+        'oil_pressure_per_throttle': 'oil_pressure / max(throttle_position, 5)',  # PSI/%
+        'coolant_time_over': f'integrate(coolant_temp > {ALERT_COOLANT_TEMP})',   # s
+        'oil_time_over': f'integrate(oil_temp > {ALERT_OIL_TEMP})',               # s
+    }
+    # derived channel units, the dashboard plots each unit on its own axis
+    DERIVED_UNITS = {
+        'coolant_rate': '°C/s',
+        'oil_temp_rate': '°C/s',
+        'oil_coolant_delta': '°C',
+        'oil_pressure_per_throttle': 'PSI/%',
+        'coolant_time_over': 's',
+        'oil_time_over': 's',
+    }
+    
+    # drive-phase segmentation (see segments.py), indexes are built when logging stops
+    SEGMENT_THRESHOLDS = {
+        'wot_throttle': 80.0,     # %
+        'idle_throttle': 5.0,     # %
+        'warm_coolant': 70.0,     # °C, below = warm-up
+        'engine_off_psi': 3.0,    # oil pressure below = engine off
+        'min_duration': 2.0,      # s, shorter runs merge into the previous phase
+    }
+    
+    # debug endpoints (/api/debug/*), disabled unless a token is set
+    DEBUG_TOKEN = os.environ.get('DEBUG_TOKEN')
+    PROFILE_MAX_SECONDS = 60
+    PROFILE_INTERVAL = 0.005  # seconds between stack samples
+    
+    # network ingest (remote loggers)
+    INGEST_ENABLED = True
+    INGEST_HOST = '0.0.0.0'
+    INGEST_PORT = int(os.environ.get('INGEST_PORT') or 5555)
+    
     # webscket 
     PING_INTERVAL = 25
     PING_TIMEOUT = 60
\ No newline at end of file
@@ -1,19 +1,28 @@
 """CSV data logging functionality"""
 
 import csv
+import math
 import os
+import time
 from datetime import datetime
 from pathlib import Path
 
+import numpy as np
+
+SENSOR_CHANNELS = ('coolant_temp', 'oil_temp', 'oil_pressure', 'throttle_position')
+
 class DataLogger:
     """csv log"""
     
-    def __init__(self, log_directory: str = '../data/logs'):
+    def __init__(self, log_directory: str = '../data/logs', channels=SENSOR_CHANNELS):
+        self.channels = tuple(channels)
         self.log_directory = Path(log_directory)
         self.log_directory.mkdir(parents=True, exist_ok=True)
         self.current_file = None
+        self.current_path = None
         self.csv_writer = None
         self.is_logging = False
+        self.last_flush = 0.0
         
     def start_logging(self, session_name: str = None):
         """start new logging session"""
@@ -27,21 +36,19 @@ class DataLogger:
         
         # Open file and create CSV writer
         self.current_file = open(filepath, 'w', newline='')
+        self.current_path = filepath
         self.csv_writer = csv.writer(self.current_file)
         
         # Write header
-        self.csv_writer.writerow([
-            'timestamp', 'coolant_temp', 'oil_temp', 
-            'oil_pressure', 'throttle_position'
-        ])
+        self.csv_writer.writerow(('timestamp',) + self.channels)
         
         self.is_logging = True
         print(f"[OK] logging to: {filepath}")
         
     def stop_logging(self):
-        """stop logging and close file"""
+        """stop logging and close file, returns the closed file's path"""
         if not self.is_logging:
-            return
+            return None
         
         if self.current_file:
             self.current_file.close()
@@ -50,20 +57,24 @@ class DataLogger:
         
         self.is_logging = False
         print("[OK] logging stopped")
+        return self.current_path
     
-    def log_data(self, data):
-        """Write data to CSV"""
+    def log_batch(self, times, columns):
+        """Write a batch of columns ({channel: values}) to CSV"""
         if not self.is_logging or not self.csv_writer:
             return
         
-        self.csv_writer.writerow([
-            data.timestamp,
-            data.coolant_temp,
-            data.oil_temp,
-            data.oil_pressure,
-            data.throttle_position
-        ])
+        rows = np.column_stack([times] + [columns[name] for name in self.channels])
+        # 3 decimals (ms timestamps); derived and filtered values would otherwise
+        # be written with float noise like -4.800000000000001
+        rows = np.round(rows, 3)
+        # NaN (missing reading) and inf are written as an empty field, like None
+        self.csv_writer.writerows(
+            [v if math.isfinite(v) else '' for v in row] for row in rows.tolist()
+        )
         
-        # flush periodically to ensure data is written
-        if int(data.timestamp * 10) % 10 == 0:  
-            self.current_file.flush()
\ No newline at end of file
+        # flush about once a second
+        now = time.monotonic()
+        if now - self.last_flush >= 1.0:
+            self.current_file.flush()
+            self.last_flush = now
\ No newline at end of file
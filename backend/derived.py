@@ -0,0 +1,316 @@
+"""
+Derived channels
+
+Channels are declared in config as expressions over the sensor channels
+(and earlier derived channels) and compiled once into NumPy operations
+that run on a whole batch at a time:
+
+  'oil_coolant_delta': 'oil_temp - coolant_temp'
+  'coolant_rate':      'ddt(ema(coolant_temp, 3))'
+  'coolant_time_over': 'integrate(coolant_temp > 100)'
+
+Supported: numbers, + - * / **, comparisons (1.0 / 0.0), and / or / not,
+and the functions below. ddt, integrate and ema keep state between
+batches, so results are continuous across batch boundaries. Infinite
+results (division by zero) are published as missing (NaN).
+
+  abs(x)  min(a, b)  max(a, b)  clip(x, lo, hi)  where(cond, a, b)
+  ddt(x)             rate of change per second
+  integrate(x)       running integral over time (seconds x value)
+  ema(x, tau)        exponential moving average, time constant tau seconds
+"""
+
+import ast
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+class DerivedChannelError(ValueError):
+    """invalid derived channel definition"""
+
+# log-scale headroom before a scan chunk is split (exp(600) ~ 1e260)
+_MAX_LOG_GAIN = 600.0
+
+def first_order_scan(x: np.ndarray, decay: np.ndarray, y0: float) -> np.ndarray:
+    """y[i] = decay[i] * y[i-1] + (1 - decay[i]) * x[i], vectorized
+
+    NaN inputs hold the previous output. Uses a cumulative log-product,
+    split into chunks so the scaling never overflows.
+    """
+    x = np.asarray(x, dtype=float)
+    decay = np.broadcast_to(np.asarray(decay, dtype=float), x.shape)
+    y = np.empty_like(x)
+    if x.size == 0:
+        return y
+
+    valid = ~np.isnan(x)
+    d = np.where(valid, np.clip(decay, 1e-200, 1.0), 1.0)
+    gain = np.where(valid, 1.0 - d, 0.0)
+    xs = np.where(valid, x, 0.0)
+    log_d = np.log(d)
+
+    if y0 is None or math.isnan(y0):
+        # nothing to hold yet: start from the first valid sample
+        first = int(np.argmax(valid)) if valid.any() else x.size
+        y[:first] = np.nan
+        if first == x.size:
+            return y
+        prev = xs[first]
+        y[first] = prev
+        start = first + 1
+    else:
+        prev = y0
+        start = 0
+
+    while start < x.size:
+        cum = np.cumsum(log_d[start:])
+        end = x.size
+        over = np.nonzero(cum < -_MAX_LOG_GAIN)[0]
+        if over.size:
+            end = start + max(int(over[0]), 1)
+            cum = cum[:end - start]
+        scale = np.exp(cum)
+        y[start:end] = scale * (prev + np.cumsum(gain[start:end] * xs[start:end] / scale))
+        prev = y[end - 1]
+        start = end
+    return y
+
+class _State:
+    """carried values for one stateful call site"""
+
+    def __init__(self):
+        self.last_t = None
+        self.last_x = None
+        self.total = 0.0
+
+class _Context:
+    """evaluation inputs for one batch"""
+
+    def __init__(self, times: np.ndarray, columns: Dict[str, np.ndarray], states: List[_State]):
+        self.times = times
+        self.columns = columns
+        self.states = states
+
+def _deltas(times: np.ndarray, last_t: Optional[float]) -> np.ndarray:
+    """time since the previous sample, 0 for the very first one"""
+    prev = times[0] if last_t is None else last_t
+    return np.diff(times, prepend=prev)
+
+def _ddt(ctx: _Context, slot: int, x: np.ndarray) -> np.ndarray:
+    state = ctx.states[slot]
+    prev_x = np.nan if state.last_x is None else state.last_x
+    dx = np.diff(x, prepend=prev_x)
+    dt = _deltas(ctx.times, state.last_t)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(dt > 0, dx / dt, np.nan)
+    state.last_t = float(ctx.times[-1])
+    state.last_x = float(x[-1])
+    return rate
+
+def _integrate(ctx: _Context, slot: int, x: np.ndarray) -> np.ndarray:
+    state = ctx.states[slot]
+    dt = _deltas(ctx.times, state.last_t)
+    area = np.cumsum(np.nan_to_num(x) * dt) + state.total
+    state.last_t = float(ctx.times[-1])
+    state.total = float(area[-1])
+    return area
+
+def _ema(ctx: _Context, slot: int, x: np.ndarray, tau: np.ndarray) -> np.ndarray:
+    state = ctx.states[slot]
+    dt = _deltas(ctx.times, state.last_t)
+    with np.errstate(divide='ignore'):
+        decay = np.exp(-dt / np.maximum(tau, 1e-9))
+    y = first_order_scan(x, decay, state.last_x)
+    state.last_t = float(ctx.times[-1])
+    state.last_x = float(y[-1])
+    return y
+
+def _as_float(value) -> np.ndarray:
+    return np.asarray(value, dtype=float)
+
+# name -> (arg count, implementation)
+_FUNCTIONS = {
+    'abs': (1, np.abs),
+    'min': (2, np.minimum),
+    'max': (2, np.maximum),
+    'clip': (3, np.clip),
+    'where': (3, lambda c, a, b: np.where(c != 0, a, b)),
+}
+
+# name -> (arg count, implementation taking ctx and state slot)
+_STATEFUL = {
+    'ddt': (1, _ddt),
+    'integrate': (1, _integrate),
+    'ema': (2, _ema),
+}
+
+_BINOPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.Pow: np.power,
+}
+
+_COMPARE = {
+    ast.Lt: np.less,
+    ast.LtE: np.less_equal,
+    ast.Gt: np.greater,
+    ast.GtE: np.greater_equal,
+    ast.Eq: np.equal,
+    ast.NotEq: np.not_equal,
+}
+
+Node = Callable[[_Context], np.ndarray]
+
+class _Compiler:
+    """turn one expression AST into a tree of closures"""
+
+    def __init__(self, name: str, known: Sequence[str], state_count: int):
+        self.name = name
+        self.known = set(known)
+        self.state_count = state_count
+
+    def error(self, message: str) -> DerivedChannelError:
+        return DerivedChannelError(f"{self.name}: {message}")
+
+    def compile(self, expression: str) -> Node:
+        try:
+            tree = ast.parse(expression, mode='eval')
+        except SyntaxError as e:
+            raise self.error(f"syntax error in '{expression}': {e.msg}")
+        return self.visit(tree.body)
+
+    def visit(self, node) -> Node:
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+                and not isinstance(node.value, bool):
+            value = float(node.value)
+            return lambda ctx: value
+
+        if isinstance(node, ast.Name):
+            channel = node.id
+            if channel not in self.known:
+                raise self.error(f"unknown channel '{channel}'")
+            return lambda ctx: ctx.columns[channel]
+
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+            op = _BINOPS[type(node.op)]
+            left, right = self.visit(node.left), self.visit(node.right)
+
+            def binop(ctx):
+                with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                    return op(left(ctx), right(ctx))
+            return binop
+
+        if isinstance(node, ast.UnaryOp):
+            operand = self.visit(node.operand)
+            if isinstance(node.op, ast.USub):
+                return lambda ctx: np.negative(operand(ctx))
+            if isinstance(node.op, ast.UAdd):
+                return operand
+            if isinstance(node.op, ast.Not):
+                return lambda ctx: _as_float(np.asarray(operand(ctx)) == 0)
+
+        if isinstance(node, ast.Compare):
+            ops = [_COMPARE.get(type(op)) for op in node.ops]
+            if None in ops:
+                raise self.error("unsupported comparison")
+            operands = [self.visit(node.left)] + [self.visit(c) for c in node.comparators]
+
+            def compare(ctx):
+                values = [operand(ctx) for operand in operands]
+                result = np.ones(np.shape(ctx.times), dtype=bool)
+                for op, a, b in zip(ops, values, values[1:]):
+                    result &= op(a, b)
+                return _as_float(result)
+            return compare
+
+        if isinstance(node, ast.BoolOp):
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            values = [self.visit(v) for v in node.values]
+
+            def boolop(ctx):
+                result = np.asarray(values[0](ctx)) != 0
+                for value in values[1:]:
+                    result = combine(result, np.asarray(value(ctx)) != 0)
+                return _as_float(result)
+            return boolop
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+            func = node.func.id
+            args = [self.visit(a) for a in node.args]
+
+            if func in _FUNCTIONS:
+                arity, impl = _FUNCTIONS[func]
+                self.check_arity(func, arity, args)
+                return lambda ctx: impl(*(a(ctx) for a in args))
+
+            if func in _STATEFUL:
+                arity, impl = _STATEFUL[func]
+                self.check_arity(func, arity, args)
+                slot = self.state_count
+                self.state_count += 1
+
+                def stateful(ctx):
+                    values = [np.broadcast_to(_as_float(a(ctx)), np.shape(ctx.times)) for a in args]
+                    return impl(ctx, slot, *values)
+                return stateful
+
+            raise self.error(f"unknown function '{func}'")
+
+        raise self.error(f"unsupported expression '{ast.unparse(node)}'")
+
+    def check_arity(self, func: str, arity: int, args: list):
+        if len(args) != arity:
+            raise self.error(f"{func}() takes {arity} argument(s), got {len(args)}")
+
+class DerivedChannels:
+    """compiled set of derived channel definitions"""
+
+    def __init__(self, definitions: Dict[str, str], base_channels: Sequence[str]):
+        self.names: Tuple[str, ...] = tuple(definitions)
+        self.state_count = 0
+        self._nodes: List[Tuple[str, Node]] = []
+
+        known = list(base_channels)
+        for name, expression in definitions.items():
+            if name in known:
+                raise DerivedChannelError(f"{name}: channel already defined")
+            compiler = _Compiler(name, known, self.state_count)
+            self._nodes.append((name, compiler.compile(expression)))
+            self.state_count = compiler.state_count
+            known.append(name)
+
+    def evaluator(self) -> 'DerivedEvaluator':
+        """independent evaluation state, one per data stream"""
+        return DerivedEvaluator(self)
+
+class DerivedEvaluator:
+    """evaluate derived channels batch by batch for one stream"""
+
+    def __init__(self, channels: DerivedChannels):
+        self.channels = channels
+        self.reset()
+
+    def reset(self):
+        self.states = [_State() for _ in range(self.channels.state_count)]
+        self.last_t = None
+
+    def evaluate(self, times: np.ndarray, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """return the derived columns for one batch"""
+        if not self.channels.names or len(times) == 0:
+            return {}
+        if self.last_t is not None and times[0] < self.last_t:
+            self.reset()  # stream restarted
+        self.last_t = float(times[-1])
+
+        ctx = _Context(times, dict(columns), self.states)
+        shape = np.shape(times)
+        result = {}
+        for name, node in self.channels._nodes:
+            value = np.broadcast_to(_as_float(node(ctx)), shape).astype(float)
+            value[np.isinf(value)] = np.nan  # e.g. division by zero, treated as missing
+            ctx.columns[name] = value
+            result[name] = value
+        return result
@@ -0,0 +1,206 @@
+"""
+Per-channel digital filters
+
+Filters run on parsed batches on the host, so they can be tuned without
+re-flashing the firmware. Each channel gets a chain of filters from config
+and the result is published next to the raw value as '<channel>_filtered':
+
+  'oil_pressure': [{'type': 'median', 'n': 5},
+                   {'type': 'kalman', 'process_noise': 20, 'measurement_noise': 2}]
+
+  median          n              median of the last n samples (spike rejection)
+  iir             tau            single-pole low-pass, time constant tau seconds
+  moving_average  window         mean of the last window samples
+  kalman          process_noise  random-walk Kalman filter; process_noise is the
+                  measurement_noise  variance growth per second, measurement_noise
+                                 the sensor variance (both in units squared)
+
+All filters work on whole batches with NumPy and carry their state (the
+last samples, or the last output) between batches, so the filtered trace is
+continuous across batch boundaries. Missing samples (NaN) are skipped.
+"""
+
+import warnings
+from abc import ABC, abstractmethod
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from derived import first_order_scan
+
+SUFFIX = '_filtered'
+
+class FilterConfigError(ValueError):
+    """invalid filter configuration"""
+
+class _Filter(ABC):
+    """one filter stage for one stream"""
+
+    @abstractmethod
+    def reset(self):
+        """drop carried state"""
+
+    @abstractmethod
+    def apply(self, times: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """filter one batch, continuing from the carried state"""
+
+class _WindowFilter(_Filter):
+    """filters over the last n raw samples, the tail is carried between batches"""
+
+    def __init__(self, n: int):
+        if int(n) != n or n < 1:
+            raise ValueError(f"window size must be a positive integer, got {n!r}")
+        self.n = int(n)
+        self.reset()
+
+    def reset(self):
+        self.tail = np.full(self.n - 1, np.nan)
+
+    def _extend(self, x: np.ndarray) -> np.ndarray:
+        values = np.concatenate((self.tail, x))
+        if self.n > 1:
+            self.tail = values[-(self.n - 1):]
+        return values
+
+class MedianFilter(_WindowFilter):
+    """median of the last n samples"""
+
+    def apply(self, times, x):
+        windows = sliding_window_view(self._extend(x), self.n)
+        if not np.isnan(windows).any():
+            return np.median(windows, axis=1)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN windows stay NaN
+            return np.nanmedian(windows, axis=1)
+
+class MovingAverageFilter(_WindowFilter):
+    """mean of the last window samples"""
+
+    def __init__(self, window: int):
+        super().__init__(window)
+
+    def apply(self, times, x):
+        values = self._extend(x)
+        valid = ~np.isnan(values)
+        sums = np.cumsum(np.r_[0.0, np.where(valid, values, 0.0)])
+        counts = np.cumsum(np.r_[0, valid.astype(int)])
+        sums = sums[self.n:] - sums[:-self.n]
+        counts = counts[self.n:] - counts[:-self.n]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+class _ScanFilter(_Filter):
+    """y[i] = decay[i] * y[i-1] + (1 - decay[i]) * x[i], last output carried"""
+
+    def reset(self):
+        self.last_t = None
+        self.last_y = None
+
+    @abstractmethod
+    def decay(self, dt: np.ndarray) -> np.ndarray:
+        """per-sample decay for the given time steps"""
+
+    def apply(self, times, x):
+        dt = np.diff(times, prepend=times[0] if self.last_t is None else self.last_t)
+        y = first_order_scan(x, self.decay(np.maximum(dt, 0.0)), self.last_y)
+        self.last_t = float(times[-1])
+        self.last_y = float(y[-1])
+        return y
+
+class IIRFilter(_ScanFilter):
+    """single-pole low-pass, exact for uneven sample spacing"""
+
+    def __init__(self, tau: float):
+        if not tau > 0:
+            raise ValueError(f"tau must be positive, got {tau!r}")
+        self.tau = float(tau)
+        self.reset()
+
+    def decay(self, dt):
+        return np.exp(-dt / self.tau)
+
+class KalmanFilter(_ScanFilter):
+    """scalar Kalman filter for a random-walk signal
+
+    Uses the steady-state gain for each sample's time step, which the full
+    filter reaches within a few samples; the update is then a first-order
+    scan and runs vectorized over the batch.
+    """
+
+    def __init__(self, process_noise: float, measurement_noise: float):
+        if not process_noise > 0 or not measurement_noise > 0:
+            raise ValueError("process_noise and measurement_noise must be positive")
+        self.process_noise = float(process_noise)
+        self.measurement_noise = float(measurement_noise)
+        self.reset()
+
+    def decay(self, dt):
+        # prior variance P solves P^2 - q P - q R = 0, gain K = P / (P + R)
+        q = self.process_noise * dt
+        r = self.measurement_noise
+        prior = (q + np.sqrt(q * q + 4.0 * q * r)) / 2.0
+        return r / (prior + r)
+
+_FILTERS = {
+    'median': MedianFilter,
+    'iir': IIRFilter,
+    'moving_average': MovingAverageFilter,
+    'kalman': KalmanFilter,
+}
+
+class ChannelFilters:
+    """validated filter chains, one per configured channel"""
+
+    def __init__(self, config: Dict[str, Sequence[dict]], base_channels: Sequence[str]):
+        self._chains: List[Tuple[str, List[Tuple[type, dict]]]] = []
+        for channel, stages in config.items():
+            if channel not in base_channels:
+                raise FilterConfigError(f"{channel}: unknown channel")
+            chain = []
+            for stage in stages:
+                params = dict(stage)
+                kind = params.pop('type', None)
+                if kind not in _FILTERS:
+                    raise FilterConfigError(
+                        f"{channel}: unknown filter {kind!r}, expected one of {', '.join(_FILTERS)}")
+                try:
+                    _FILTERS[kind](**params)
+                except (TypeError, ValueError) as e:
+                    raise FilterConfigError(f"{channel}: {kind}: {e}")
+                chain.append((_FILTERS[kind], params))
+            if chain:
+                self._chains.append((channel, chain))
+        self.names: Tuple[str, ...] = tuple(channel + SUFFIX for channel, _ in self._chains)
+
+    def pipeline(self) -> 'FilterPipeline':
+        """independent filter state, one per data stream"""
+        return FilterPipeline(self)
+
+class FilterPipeline:
+    """apply the filter chains batch by batch for one stream"""
+
+    def __init__(self, filters: ChannelFilters):
+        self.filters = filters
+        self.reset()
+
+    def reset(self):
+        self.chains = [(channel, [cls(**params) for cls, params in chain])
+                       for channel, chain in self.filters._chains]
+        self.last_t = None
+
+    def apply(self, times: np.ndarray, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """return the filtered columns for one batch"""
+        if not self.chains or len(times) == 0:
+            return {}
+        if self.last_t is not None and times[0] < self.last_t:
+            self.reset()  # stream restarted
+        self.last_t = float(times[-1])
+
+        result = {}
+        for channel, stages in self.chains:
+            values = np.asarray(columns[channel], dtype=float)
+            for stage in stages:
+                values = stage.apply(times, values)
+            result[channel + SUFFIX] = values
+        return result
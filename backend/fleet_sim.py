@@ -0,0 +1,274 @@
+"""
+Vectorized fleet simulator for scale testing
+Advances K simulated cars at once with the same dynamics as demo.py
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# column order of the value arrays, matches the CSV log layout
+CHANNELS = ('coolant_temp', 'oil_temp', 'oil_pressure', 'throttle_position')
+
+# throttle change buckets: heavy braking, light deceleration, acceleration
+THROTTLE_STEP_LOW = np.array([-15.0, -5.0, 5.0])
+THROTTLE_STEP_HIGH = np.array([-8.0, -2.0, 15.0])
+
+# demo.py's tick; its per-step coefficients are rescaled to the simulator's rate
+DEMO_DT = 0.1
+
+@dataclass
+class Scenario:
+    """scripted fault applied to one car"""
+    kind: str              # 'overheat' or 'pressure_loss'
+    car: int
+    start: float           # seconds into the run
+    ramp: float = 60.0     # seconds to reach full severity
+    severity: float = 1.0  # 0..1
+
+    KINDS = ('overheat', 'pressure_loss')
+
+    @classmethod
+    def parse(cls, spec: str) -> 'Scenario':
+        """parse 'kind:car:start[:ramp[:severity]]'"""
+        parts = spec.split(':')
+        if len(parts) < 3 or parts[0] not in cls.KINDS:
+            raise ValueError(f"Invalid scenario '{spec}', expected kind:car:start[:ramp[:severity]]")
+        scenario = cls(kind=parts[0], car=int(parts[1]), start=float(parts[2]))
+        if len(parts) > 3:
+            scenario.ramp = float(parts[3])
+        if len(parts) > 4:
+            scenario.severity = float(parts[4])
+        return scenario
+
+class FleetSimulator:
+    """simulate K cars in lockstep with array operations"""
+
+    def __init__(self, cars: int = 1, rate_hz: float = 10.0, seed: Optional[int] = None,
+                 scenarios: Optional[List[Scenario]] = None):
+        if cars < 1:
+            raise ValueError("cars must be >= 1")
+        self.cars = cars
+        self.dt = 1.0 / rate_hz
+        ticks = self.dt / DEMO_DT
+        # relaxation per step and throttle-change probability compound over demo ticks,
+        # random-walk noise grows with the square root of the step length
+        self.coolant_gain = 1.0 - (1.0 - 0.05) ** ticks
+        self.oil_gain = 1.0 - (1.0 - 0.03) ** ticks
+        self.pressure_gain = 1.0 - (1.0 - 0.1) ** ticks
+        self.big_change_prob = 1.0 - (1.0 - 0.3) ** ticks
+        self.noise_scale = np.sqrt(ticks)
+        self.rng = np.random.default_rng(seed)
+        self.scenarios = list(scenarios or [])
+        for scenario in self.scenarios:
+            if not 0 <= scenario.car < cars:
+                raise ValueError(f"Scenario car {scenario.car} out of range")
+
+        self.timestamp = 0.0
+        self.coolant_temp = np.full(cars, 20.0)  # start at ambient
+        self.oil_temp = np.full(cars, 20.0)
+        self.oil_pressure = np.zeros(cars)
+        self.throttle = np.zeros(cars)
+
+        # per-car phase offset so the cooling cycles are not in lockstep
+        self.phase = self.rng.uniform(0, 60.0, cars) if cars > 1 else np.zeros(cars)
+
+        # scenario modifiers, recomputed every step
+        self._coolant_offset = np.zeros(cars)
+        self._pressure_factor = np.ones(cars)
+        self._coolant_max = np.full(cars, 105.0)
+        self._oil_max = np.full(cars, 125.0)
+        self._pressure_min = np.full(cars, 5.0)
+
+    def _apply_scenarios(self, t: float):
+        """update fault modifiers for the current time"""
+        if not self.scenarios:
+            return
+        self._coolant_offset.fill(0.0)
+        self._pressure_factor.fill(1.0)
+        for scenario in self.scenarios:
+            if t < scenario.start:
+                continue
+            level = min((t - scenario.start) / max(scenario.ramp, self.dt), 1.0) * scenario.severity
+            car = scenario.car
+            if scenario.kind == 'overheat':
+                # failing fan / coolant loss: target climbs well past normal
+                self._coolant_offset[car] += 35.0 * level
+                self._coolant_max[car] = 130.0
+                self._oil_max[car] = 150.0
+            else:
+                # pump / sender failure: pressure bleeds away
+                self._pressure_factor[car] *= 1.0 - 0.9 * level
+                self._pressure_min[car] = 0.0
+
+    def step_block(self, steps: int) -> Tuple[np.ndarray, np.ndarray]:
+        """advance all cars by `steps` samples
+
+        returns (timestamps [steps], values [steps, cars, 4]) with values in CHANNELS order
+        """
+        k = self.cars
+        rng = self.rng
+        timestamps = self.timestamp + self.dt * np.arange(1, steps + 1)
+        values = np.empty((steps, k, len(CHANNELS)))
+
+        # draw all noise for the block up front
+        noise = self.noise_scale
+        coolant_noise = rng.uniform(-1.5, 1.5, (steps, k)) * noise
+        oil_noise = rng.uniform(-1.2, 1.2, (steps, k)) * noise
+        pressure_noise = rng.uniform(-2.0, 2.0, (steps, k)) * noise
+        big_change = rng.random((steps, k)) < self.big_change_prob  # 30% per 100 ms
+        bucket = rng.integers(0, 3, (steps, k))
+        throttle_change = np.where(
+            big_change,
+            rng.uniform(THROTTLE_STEP_LOW[bucket], THROTTLE_STEP_HIGH[bucket]),
+            rng.uniform(-2.0, 2.0, (steps, k)) * noise)
+
+        coolant, oil = self.coolant_temp, self.oil_temp
+        pressure, throttle = self.oil_pressure, self.throttle
+        scratch = np.empty(k)
+
+        for i in range(steps):
+            t = timestamps[i]
+            self._apply_scenarios(t)
+            tp = t + self.phase
+            warmup_progress = min(t / 30.0, 1.0)
+
+            # coolant: 10 s cooling cycle around operating temp
+            base_coolant = 88 + np.sin(tp / 10.0) * 4 + self._coolant_offset
+            coolant += (base_coolant - coolant) * self.coolant_gain
+            coolant += coolant_noise[i]
+            np.clip(coolant, 20, self._coolant_max, out=coolant)
+
+            # oil: follows coolant but lags and runs hotter
+            base_oil = coolant + 8 + np.sin(tp / 15.0) * 6
+            oil += (base_oil - oil) * self.oil_gain
+            oil += oil_noise[i]
+            np.clip(oil, 20, self._oil_max, out=oil)
+
+            # pressure: depends on throttle and temp (hotter = lower pressure)
+            np.maximum(0.7, 1.0 - (oil - 90) / 100.0, out=scratch)
+            target = np.where(throttle < 10,
+                              15 + warmup_progress * 5,
+                              35 + (throttle / 100.0) * 25)
+            target *= scratch
+            target *= self._pressure_factor
+            pressure += (target - pressure) * self.pressure_gain
+            pressure += pressure_noise[i]
+            np.clip(pressure, self._pressure_min, 80, out=pressure)
+
+            # throttle: driving cycles
+            throttle += throttle_change[i]
+            np.clip(throttle, 0, 100, out=throttle)
+
+            row = values[i]
+            row[:, 0] = coolant
+            row[:, 1] = oil
+            row[:, 2] = pressure
+            row[:, 3] = throttle
+
+        self.timestamp = float(timestamps[-1])
+        return timestamps, values
+
+    def blocks(self, duration: float, block_steps: int = 600) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """yield blocks until `duration` seconds have been simulated"""
+        remaining = int(round(duration / self.dt))
+        while remaining > 0:
+            steps = min(block_steps, remaining)
+            yield self.step_block(steps)
+            remaining -= steps
+
+def write_sessions(sim: FleetSimulator, duration: float, out_dir: str,
+                   prefix: str = 'fleet') -> List[Path]:
+    """write one CSV per car in the DataLogger format"""
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    width = len(str(sim.cars - 1))
+    paths = [out / f"{prefix}_car{car:0{width}d}_{stamp}.csv" for car in range(sim.cars)]
+    files = [open(path, 'w', newline='') for path in paths]
+    header = 'timestamp,' + ','.join(CHANNELS)
+
+    try:
+        for f in files:
+            f.write(header + '\n')
+        for timestamps, values in sim.blocks(duration):
+            for car, f in enumerate(files):
+                block = np.column_stack((timestamps, values[:, car, :]))
+                np.savetxt(f, block, fmt=('%.3f', '%.1f', '%.1f', '%.1f', '%.1f'), delimiter=',')
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+def stream_live(sim: FleetSimulator, host: str, port: int, duration: float,
+                prefix: str = 'fleet', batch_steps: int = 5, speed: float = 1.0) -> int:
+    """stream every car to an ingest server, one connection per car
+
+    speed 1.0 paces the stream in real time, 0 sends as fast as acks allow
+    """
+    from ingest_client import IngestClient
+
+    width = len(str(sim.cars - 1))
+    clients = [IngestClient(host, port, f"{prefix}_car{car:0{width}d}") for car in range(sim.cars)]
+    for client in clients:
+        client.connect()
+
+    started = time.monotonic()
+    sent = 0
+    try:
+        for timestamps, values in sim.blocks(duration, batch_steps):
+            for car, client in enumerate(clients):
+                rows = np.column_stack((timestamps, values[:, car, :])).round(1)
+                client.send_batch(rows.tolist())
+            sent += len(timestamps) * sim.cars
+            if speed > 0:
+                delay = timestamps[-1] / speed - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+        for client in clients:
+            if not client.flush():
+                print(f"[WARNING] {client.vehicle_id}: {len(client.pending)} batches unacked")
+    finally:
+        for client in clients:
+            client.close()
+    return sent
+
+def main():
+    parser = argparse.ArgumentParser(description='MX5 DAQ fleet simulator')
+    parser.add_argument('--cars', type=int, default=10, help='number of simulated cars')
+    parser.add_argument('--duration', type=float, default=3600.0, help='simulated seconds')
+    parser.add_argument('--rate', type=float, default=10.0, help='sample rate (Hz)')
+    parser.add_argument('--seed', type=int, default=None, help='random seed')
+    parser.add_argument('--scenario', action='append', default=[],
+                        help='kind:car:start[:ramp[:severity]], kind is overheat or pressure_loss')
+    parser.add_argument('--out', default='../data/logs', help='output directory')
+    parser.add_argument('--prefix', default='fleet', help='session / vehicle id prefix')
+    parser.add_argument('--live', metavar='HOST:PORT', help='stream to an ingest server instead of files')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='live playback speed, 0 = as fast as possible')
+    args = parser.parse_args()
+
+    scenarios = [Scenario.parse(spec) for spec in args.scenario]
+    sim = FleetSimulator(args.cars, args.rate, args.seed, scenarios)
+
+    started = time.perf_counter()
+    if args.live:
+        host, _, port = args.live.rpartition(':')
+        samples = stream_live(sim, host or 'localhost', int(port), args.duration,
+                              args.prefix, speed=args.speed)
+        target = f"streamed to {args.live}"
+    else:
+        paths = write_sessions(sim, args.duration, args.out, args.prefix)
+        samples = int(round(args.duration * args.rate)) * args.cars
+        target = f"written to {len(paths)} sessions"
+    elapsed = time.perf_counter() - started
+    print(f"[OK] {samples} samples {target} in {elapsed:.2f}s "
+          f"({samples / elapsed:,.0f} samples/s)")
+
+if __name__ == '__main__':
+    main()
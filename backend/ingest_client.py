@@ -0,0 +1,141 @@
+"""
+Ingest client for remote loggers
+Streams sample batches to the pit server and resends unacked batches after a
+drop, or when acks stop advancing
+"""
+
+import socket
+import time
+from collections import deque
+from typing import Optional, Sequence
+
+from ingest_protocol import (FrameDecoder, ACK, encode_hello, encode_data, renumber)
+
+class IngestClient:
+    """TCP sender with cumulative acks and resend-from-ack on reconnect"""
+
+    def __init__(self, host: str, port: int, vehicle_id: str,
+                 max_pending: int = 1000, timeout: float = 5.0, resend_after: float = 2.0):
+        self.host = host
+        self.port = port
+        self.vehicle_id = vehicle_id
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.resend_after = resend_after  # seconds without ack progress before resending
+        self.last_progress = time.monotonic()
+        self.sock: Optional[socket.socket] = None
+        self.decoder = FrameDecoder()
+        self.next_seq = 1
+        self.acked_seq = 0
+        self.synced = False  # seen the server's ack for this vehicle yet
+        self.pending = deque()  # (seq, frame bytes) not yet acked
+
+    def connect(self) -> bool:
+        """connect, learn the server's acked sequence and resend the rest"""
+        self.close()
+        try:
+            self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.decoder = FrameDecoder()
+            self.sock.sendall(encode_hello(self.vehicle_id, self.acked_seq))
+            self._read_acks(block=True)
+            for _, frame in self.pending:
+                self.sock.sendall(frame)
+            self.last_progress = time.monotonic()
+            return True
+        except OSError as e:
+            print(f"[ERROR] Ingest connection failed: {e}")
+            self.close()
+            return False
+
+    def close(self):
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def send_batch(self, samples: Sequence[Sequence[Optional[float]]]) -> int:
+        """queue a batch and send it, returns its sequence number"""
+        seq = self.next_seq
+        self.next_seq += 1
+        frame = encode_data(self.vehicle_id, seq, samples)
+        if not self.pending:
+            self.last_progress = time.monotonic()
+        self.pending.append((seq, frame))
+
+        try:
+            if self.sock is None and not self.connect():
+                return seq  # stays pending until the next reconnect
+            self.sock.sendall(frame)
+            self._read_acks(block=len(self.pending) >= self.max_pending)
+            self._resend_if_stalled()
+        except OSError as e:
+            print(f"[WARNING] Ingest send failed, reconnecting: {e}")
+            self.connect()
+        return seq
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """wait until every queued batch is acked"""
+        deadline = time.monotonic() + timeout
+        while self.pending and time.monotonic() < deadline:
+            try:
+                if self.sock is None and not self.connect():
+                    time.sleep(0.5)
+                    continue
+                self._read_acks(block=True)
+            except socket.timeout:
+                pass
+            except OSError:
+                self.connect()
+                continue
+            self._resend_if_stalled()
+        return not self.pending
+
+    def _resend_if_stalled(self):
+        """reconnect and resend from the ack when acks stop advancing"""
+        if self.pending and time.monotonic() - self.last_progress > self.resend_after:
+            print(f"[WARNING] No ack progress for {self.resend_after:.1f}s, resending from {self.acked_seq}")
+            self.connect()
+
+    def _read_acks(self, block: bool):
+        """consume ack frames; blocks for at least one read if `block`"""
+        self.sock.settimeout(min(self.timeout, self.resend_after) if block else 0.0)
+        try:
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    raise ConnectionError("Server closed connection")
+                for frame in self.decoder.feed(data):
+                    if frame.kind == ACK and frame.vehicle_id == self.vehicle_id:
+                        self._on_ack(frame.seq)
+                if block:
+                    break
+        except BlockingIOError:
+            pass
+        finally:
+            if self.sock:
+                self.sock.settimeout(self.timeout)
+
+    def _on_ack(self, seq: int):
+        if not self.synced:
+            # the first ack answers our HELLO before any batch was sent, so it
+            # only covers earlier runs of this logger
+            self.synced = True
+            if seq != self.acked_seq:
+                self._renumber(seq)
+        if seq > self.acked_seq:
+            self.acked_seq = seq
+            self.last_progress = time.monotonic()
+        while self.pending and self.pending[0][0] <= self.acked_seq:
+            self.pending.popleft()
+
+    def _renumber(self, acked_seq: int):
+        """continue after what the server already has from an earlier run,
+        batches queued before the first connect keep their order"""
+        offset = acked_seq - self.acked_seq
+        self.pending = deque((seq + offset, renumber(frame, seq + offset))
+                             for seq, frame in self.pending)
+        self.next_seq += offset
+        self.acked_seq = acked_seq
@@ -0,0 +1,110 @@
+"""
+Framing for the network ingest link (remote loggers -> pit server)
+
+Every frame is a fixed header, the vehicle ID, then `count` samples of
+five little-endian float64 (timestamp, coolant_temp, oil_temp,
+oil_pressure, throttle_position). Missing values are sent as NaN.
+
+  HELLO  client -> server  seq = last sequence the client knows was acked
+  DATA   client -> server  seq = batch sequence number, starting at 1
+  ACK    server -> client  seq = highest batch accepted so far (cumulative)
+"""
+
+import math
+import re
+import struct
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+MAGIC = b'MX'
+VERSION = 1
+
+HELLO = 1
+DATA = 2
+ACK = 3
+
+# magic, version, type, vehicle id length, pad, sample count, sequence
+HEADER = struct.Struct('<2sBBBxHI')
+SAMPLE = struct.Struct('<5d')
+
+MAX_SAMPLES = 0xFFFF
+VEHICLE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+
+class ProtocolError(Exception):
+    """malformed frame on the ingest link"""
+
+@dataclass
+class Frame:
+    """decoded ingest frame"""
+    kind: int
+    vehicle_id: str
+    seq: int
+    samples: List[Tuple[Optional[float], ...]]
+
+def _check_vehicle_id(vehicle_id: str):
+    if not VEHICLE_ID_PATTERN.match(vehicle_id):
+        raise ProtocolError(f"Invalid vehicle id: {vehicle_id!r}")
+
+def encode_frame(kind: int, vehicle_id: str, seq: int,
+                 samples: Sequence[Sequence[Optional[float]]] = ()) -> bytes:
+    """build one frame"""
+    _check_vehicle_id(vehicle_id)
+    if len(samples) > MAX_SAMPLES:
+        raise ProtocolError(f"Batch too large: {len(samples)} samples")
+
+    vid = vehicle_id.encode('ascii')
+    parts = [HEADER.pack(MAGIC, VERSION, kind, len(vid), len(samples), seq), vid]
+    for sample in samples:
+        parts.append(SAMPLE.pack(*(math.nan if v is None else v for v in sample)))
+    return b''.join(parts)
+
+def encode_hello(vehicle_id: str, acked_seq: int) -> bytes:
+    return encode_frame(HELLO, vehicle_id, acked_seq)
+
+def encode_data(vehicle_id: str, seq: int, samples) -> bytes:
+    return encode_frame(DATA, vehicle_id, seq, samples)
+
+def encode_ack(vehicle_id: str, seq: int) -> bytes:
+    return encode_frame(ACK, vehicle_id, seq)
+
+def renumber(frame: bytes, seq: int) -> bytes:
+    """the same frame with another sequence number"""
+    header = HEADER.unpack_from(frame)
+    return HEADER.pack(*header[:-1], seq) + frame[HEADER.size:]
+
+class FrameDecoder:
+    """incremental decoder for a byte stream"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[Frame]:
+        """append data and return every complete frame"""
+        self.buffer += data
+        frames = []
+        offset = 0
+        buf = self.buffer
+
+        while len(buf) - offset >= HEADER.size:
+            magic, version, kind, vid_len, count, seq = HEADER.unpack_from(buf, offset)
+            if magic != MAGIC or version != VERSION:
+                raise ProtocolError("Bad frame header")
+            if kind not in (HELLO, DATA, ACK):
+                raise ProtocolError(f"Unknown frame type {kind}")
+
+            end = offset + HEADER.size + vid_len + count * SAMPLE.size
+            if len(buf) < end:
+                break
+
+            start = offset + HEADER.size
+            vehicle_id = bytes(buf[start:start + vid_len]).decode('ascii', errors='replace')
+            _check_vehicle_id(vehicle_id)
+            samples = [
+                tuple(None if math.isnan(v) else v for v in values)
+                for values in SAMPLE.iter_unpack(buf[start + vid_len:end])
+            ]
+            frames.append(Frame(kind, vehicle_id, seq, samples))
+            offset = end
+
+        del buf[:offset]
+        return frames
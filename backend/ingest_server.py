@@ -0,0 +1,142 @@
+"""network ingest for remote loggers (TCP)"""
+
+import time
+from typing import Callable, Dict, List, Tuple
+
+import eventlet
+from eventlet.green import socket
+
+from ingest_protocol import (FrameDecoder, ProtocolError, Frame,
+                             HELLO, DATA, encode_ack)
+from serial_handler import SensorData
+
+class VehicleState:
+    """per-vehicle sequence tracking"""
+
+    def __init__(self, acked_seq: int = 0):
+        self.acked_seq = acked_seq
+        self.samples = 0
+        self.duplicates = 0
+        self.last_seen = time.time()
+
+    def to_dict(self):
+        return {
+            'acked_seq': self.acked_seq,
+            'samples': self.samples,
+            'duplicates': self.duplicates,
+            'last_seen': self.last_seen
+        }
+
+class IngestServer:
+    """accept framed sample batches from remote loggers
+
+    Each DATA frame is delivered once: sequence numbers at or below the
+    vehicle's acked sequence are dropped as duplicates and re-acked.
+    Acknowledgements are cumulative and sent once per read, not per frame.
+    On a gap or a failed delivery the connection is closed after the ack,
+    so the client reconnects and resends everything after it.
+    """
+
+    def __init__(self, host: str, port: int,
+                 callback: Callable[[str, List[SensorData]], None]):
+        self.host = host
+        self.port = port
+        self.callback = callback
+        self.vehicles: Dict[str, VehicleState] = {}
+        self.pool = eventlet.GreenPool()
+        self.listener = None
+        self.is_running = False
+
+    def start(self):
+        """start listening in background greenthreads"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self.listener = eventlet.listen((self.host, self.port))
+        self.port = self.listener.getsockname()[1]
+        eventlet.spawn_n(self._serve_tcp)
+        print(f"[OK] Ingest listening on tcp://{self.host}:{self.port}")
+
+    def stop(self):
+        """stop accepting new connections"""
+        self.is_running = False
+        if self.listener:
+            self.listener.close()
+        self.listener = None
+
+    def status(self) -> Dict[str, dict]:
+        return {vid: state.to_dict() for vid, state in self.vehicles.items()}
+
+    def _serve_tcp(self):
+        while self.is_running:
+            try:
+                conn, addr = self.listener.accept()
+            except OSError:
+                break
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.pool.spawn_n(self._handle_conn, conn, addr)
+
+    def _handle_conn(self, conn, addr):
+        decoder = FrameDecoder()
+        print(f"[OK] Ingest client connected: {addr[0]}:{addr[1]}")
+        try:
+            while self.is_running:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                acks, in_sync = self._process(decoder.feed(data))
+                if acks:
+                    conn.sendall(acks)
+                if not in_sync:
+                    print(f"[WARNING] Ingest resync, closing connection from {addr[0]}")
+                    break
+        except ProtocolError as e:
+            print(f"[WARNING] Ingest protocol error from {addr[0]}: {e}")
+        except OSError as e:
+            print(f"[WARNING] Ingest connection error from {addr[0]}: {e}")
+        finally:
+            conn.close()
+            print(f"[OK] Ingest client disconnected: {addr[0]}:{addr[1]}")
+
+    def _process(self, frames: List[Frame]) -> Tuple[bytes, bool]:
+        """deliver new batches, returns the cumulative acks to send and
+        False if the client has to resend from its ack"""
+        touched = {}
+        in_sync = True
+        for frame in frames:
+            state = self.vehicles.get(frame.vehicle_id)
+
+            if frame.kind == HELLO:
+                # a fresh server adopts the client's acked sequence
+                if state is None:
+                    state = self.vehicles[frame.vehicle_id] = VehicleState(frame.seq)
+                touched[frame.vehicle_id] = state
+                continue
+            if frame.kind != DATA:
+                continue
+
+            if state is None:
+                state = self.vehicles[frame.vehicle_id] = VehicleState(frame.seq - 1)
+            touched[frame.vehicle_id] = state
+            state.last_seen = time.time()
+
+            if frame.seq <= state.acked_seq:
+                state.duplicates += 1
+                continue
+            if frame.seq != state.acked_seq + 1:
+                in_sync = False  # gap, later frames can't be accepted either
+                break
+
+            samples = [SensorData(*values) for values in frame.samples]
+            try:
+                self.callback(frame.vehicle_id, samples)
+            except Exception as e:
+                # not acked; the connection is dropped so the client resends it
+                print(f"[ERROR] Ingest callback failed for {frame.vehicle_id}: {e}")
+                in_sync = False
+                break
+            state.acked_seq = frame.seq
+            state.samples += len(samples)
+
+        acks = b''.join(encode_ack(vid, state.acked_seq) for vid, state in touched.items())
+        return acks, in_sync
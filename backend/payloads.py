@@ -0,0 +1,74 @@
+"""
+Socket.IO payload encoding
+
+Batches travel through the backend as a timestamp array plus one float64
+column per channel (sensor channels, then derived channels), with NaN for
+missing values.
+
+JSON mode sends one dict per sample. Binary mode sends the channel schema
+once on connect, then each frame as a single binary attachment:
+
+  float64[n] timestamps, then float32[n] per channel in schema order
+
+all little-endian, so the dashboard can view each column as a typed array
+without parsing. n is byteLength / (8 + 4 * channels).
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from serial_handler import SensorData
+
+CHANNELS = ('coolant_temp', 'oil_temp', 'oil_pressure', 'throttle_position')
+
+FORMAT_JSON = 'json'
+FORMAT_BINARY = 'binary'
+
+Columns = Dict[str, np.ndarray]
+
+def schema(channels: Sequence[str] = CHANNELS, units: Optional[Dict[str, str]] = None) -> dict:
+    """channel layout announced to clients"""
+    return {
+        'version': 1,
+        'formats': [FORMAT_JSON, FORMAT_BINARY],
+        'time': {'name': 'timestamp', 'dtype': 'float64'},
+        'channels': list(channels),
+        'dtype': 'float32',
+        'byteorder': 'little',
+        'layout': 'columns',
+        'units': {name: unit for name, unit in (units or {}).items() if name in channels}
+    }
+
+def columns_from_samples(samples: Sequence[SensorData]) -> Tuple[np.ndarray, Columns]:
+    """SensorData list -> (timestamps, {channel: values})"""
+    n = len(samples)
+    times = np.fromiter((s.timestamp for s in samples), dtype=float, count=n)
+    values = np.array([[s.coolant_temp, s.oil_temp, s.oil_pressure, s.throttle_position]
+                       for s in samples], dtype=float).reshape(n, len(CHANNELS))
+    return times, {name: values[:, k] for k, name in enumerate(CHANNELS)}
+
+def to_json(times: np.ndarray, columns: Columns, channels: Sequence[str] = CHANNELS) -> List[dict]:
+    """one dict per sample, NaN and inf as None (JSON has no token for them)"""
+    rows = [times.tolist()] + [columns[name].tolist() for name in channels]
+    keys = ('timestamp',) + tuple(channels)
+    return [
+        {key: (None if isinstance(v, float) and not math.isfinite(v) else v) for key, v in zip(keys, row)}
+        for row in zip(*rows)
+    ]
+
+def pack_frame(times: np.ndarray, columns: Columns, channels: Sequence[str] = CHANNELS) -> bytes:
+    """pack a batch into one binary frame"""
+    n = len(times)
+    values = np.empty((len(channels), n), dtype='<f4')
+    for k, name in enumerate(channels):
+        values[k] = columns[name]
+    return np.asarray(times, dtype='<f8').tobytes() + values.tobytes()
+
+def unpack_frame(frame: bytes, channels: Sequence[str] = CHANNELS) -> Tuple[np.ndarray, Columns]:
+    """inverse of pack_frame"""
+    n = len(frame) // (8 + 4 * len(channels))
+    times = np.frombuffer(frame, dtype='<f8', count=n)
+    values = np.frombuffer(frame, dtype='<f4', offset=8 * n).reshape(len(channels), n)
+    return times, {name: values[k] for k, name in enumerate(channels)}
@@ -0,0 +1,162 @@
+"""
+On-demand profiling for the live backend
+
+SamplingProfiler runs in a real OS thread (not a greenthread) and samples
+the stack of every other thread at a fixed interval with
+sys._current_frames(). Greenlets all run on the main thread, so their
+stacks show up under MainThread while they hold the CPU. Output is
+collapsed stacks ("thread;outer;...;inner count"), ready for
+flamegraph.pl or speedscope.
+"""
+
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Dict, List
+
+try:
+    # the app monkey-patches threading/time; the sampler needs the real ones
+    from eventlet.patcher import original
+    _threading = original('threading')
+    _time = original('time')
+except ImportError:
+    import time as _time
+    _threading = threading
+
+def thread_names() -> Dict[int, str]:
+    """thread ident -> name, for patched and unpatched threads"""
+    names = {}
+    for module in (threading, _threading):
+        for thread in module.enumerate():
+            if thread.ident is not None:
+                names.setdefault(thread.ident, thread.name)
+    return names
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """periodic stack sampler across all threads"""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._stop = _threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running:
+            raise RuntimeError("Profiler already running")
+        self.stacks.clear()
+        self.samples = 0
+        self._stop.clear()
+        self.started = _time.perf_counter()
+        self._thread = _threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """stop sampling, waits at most one interval for the sampler to exit"""
+        self._stop.set()
+        self.elapsed = _time.perf_counter() - self.started
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def _run(self):
+        own = _threading.get_ident()
+        names = thread_names()
+        while not self._stop.is_set():
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                name = names.get(ident)
+                if name is None:
+                    names = thread_names()
+                    name = names.get(ident, f'thread-{ident}')
+                stack.append(name)
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+            self._stop.wait(self.interval)
+
+    def collapsed(self) -> str:
+        """flame-graph collapsed stack format"""
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common()) + '\n'
+
+    def summary(self, top: int = 50) -> dict:
+        return {
+            'interval': self.interval,
+            'duration': round(self.elapsed, 3),
+            'samples': self.samples,
+            'stacks': [{'stack': stack, 'count': count}
+                       for stack, count in self.stacks.most_common(top)]
+        }
+
+def thread_cpu_times() -> List[dict]:
+    """CPU seconds used by each OS thread (Linux/Unix)"""
+    names = thread_names()
+    native_ids = {}
+    for module in (threading, _threading):
+        for thread in module.enumerate():
+            native_id = getattr(thread, 'native_id', None)  # green threads have none
+            if thread.ident is not None and native_id is not None:
+                native_ids[thread.ident] = native_id
+
+    threads = []
+    for ident in sys._current_frames():
+        entry = {'ident': ident, 'name': names.get(ident, f'thread-{ident}'),
+                 'native_id': native_ids.get(ident), 'cpu_seconds': None}
+        try:
+            clock = _time.pthread_getcpuclockid(ident)
+            entry['cpu_seconds'] = round(_time.clock_gettime(clock), 4)
+        except (AttributeError, OSError, OverflowError):
+            pass  # not available on this platform
+        threads.append(entry)
+    return sorted(threads, key=lambda t: t['cpu_seconds'] or 0, reverse=True)
+
+def start_tracemalloc(frames: int = 10) -> bool:
+    """start tracing if needed, returns True if this call started it"""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(frames)
+    return True
+
+def stop_tracemalloc():
+    """stop tracing if it is still running"""
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def top_allocations(top: int = 20, stop: bool = False) -> dict:
+    """largest live allocations by source line since tracing started"""
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    if stop:
+        tracemalloc.stop()
+
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+    stats = snapshot.statistics('lineno')
+    return {
+        'traced_bytes': current,
+        'peak_bytes': peak,
+        'top': [{
+            'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            'size_bytes': stat.size,
+            'count': stat.count
+        } for stat in stats[:top]]
+    }
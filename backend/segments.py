@@ -0,0 +1,273 @@
+"""
+Drive-phase segmentation for logged sessions
+
+Each session is split into phases in one vectorized pass over the
+throttle, oil pressure and coolant traces:
+
+  off       oil pressure below the engine-off threshold
+  warmup    coolant below operating temperature (cold start)
+  idle      throttle closed
+  cruise    part throttle
+  wot       wide open throttle pulls
+  cooldown  idle / engine off after the last drive
+
+The result is written as a small index next to the CSV
+(<session>.segments.json) with per-segment stats, so queries across all
+sessions never reopen the raw logs.
+"""
+
+import argparse
+import json
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from session_compare import load_session, parse_event
+
+PHASES = ('off', 'warmup', 'idle', 'cruise', 'wot', 'cooldown')
+OFF, WARMUP, IDLE, CRUISE, WOT, COOLDOWN = range(len(PHASES))
+
+INDEX_SUFFIX = '.segments.json'
+INDEX_VERSION = 1
+
+CHANNELS = ('coolant_temp', 'oil_temp', 'oil_pressure', 'throttle_position')
+
+# per-segment stats kept in the index (field name '<channel>_<stat>')
+STATS = {
+    'coolant_temp': ('mean', 'max'),
+    'oil_temp': ('mean', 'max'),
+    'oil_pressure': ('mean', 'min'),
+    'throttle_position': ('mean', 'max'),
+}
+
+@dataclass
+class Thresholds:
+    """classification thresholds"""
+    wot_throttle: float = 80.0      # %
+    idle_throttle: float = 5.0      # %
+    warm_coolant: float = 70.0      # °C, below = warm-up
+    engine_off_psi: float = 3.0     # oil pressure below = engine off
+    min_duration: float = 2.0       # s, shorter runs merge into the previous phase
+    throttle_smoothing: float = 0.5 # s, moving average before classifying
+
+def _moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    """centered moving average, NaN treated as missing"""
+    if window <= 1:
+        return values
+    valid = ~np.isnan(values)
+    csum = np.cumsum(np.r_[0.0, np.where(valid, values, 0.0)])
+    ccount = np.cumsum(np.r_[0, valid.astype(int)])
+    half = window // 2
+    idx = np.arange(len(values))
+    lo = np.clip(idx - half, 0, len(values))
+    hi = np.clip(idx + half + 1, 0, len(values))
+    counts = ccount[hi] - ccount[lo]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, (csum[hi] - csum[lo]) / np.maximum(counts, 1), np.nan)
+
+def _run_starts(labels: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+
+def classify(times: np.ndarray, columns: Dict[str, np.ndarray],
+             thresholds: Thresholds = Thresholds()) -> np.ndarray:
+    """phase code per sample"""
+    n = len(times)
+    steps = np.diff(times)
+    steps = steps[steps > 0]  # duplicate timestamps say nothing about the rate
+    dt = float(np.median(steps)) if steps.size else 0.1
+    throttle = _moving_average(columns['throttle_position'],
+                               max(1, int(round(thresholds.throttle_smoothing / dt))))
+    pressure = columns['oil_pressure']
+    coolant = columns['coolant_temp']
+
+    with np.errstate(invalid='ignore'):
+        labels = np.full(n, CRUISE, dtype=np.int8)
+        labels[throttle < thresholds.idle_throttle] = IDLE
+        labels[coolant < thresholds.warm_coolant] = WARMUP
+        labels[throttle >= thresholds.wot_throttle] = WOT
+        labels[pressure < thresholds.engine_off_psi] = OFF
+
+    # merge short runs into the preceding phase (WOT pulls are kept as is)
+    starts = _run_starts(labels)
+    ends = np.r_[starts[1:], n]
+    durations = times[ends - 1] - times[starts] + dt
+    run_labels = labels[starts]
+    keep = (durations >= thresholds.min_duration) | (run_labels == WOT)
+    if keep.any():
+        source = np.where(keep, np.arange(len(starts)), -1)
+        source = np.maximum.accumulate(source)
+        source[source < 0] = np.argmax(keep)  # leading short runs take the first kept phase
+        labels = np.repeat(run_labels[source], ends - starts)
+
+    # everything not driving after the last cruise / WOT sample is cool-down
+    driving = np.flatnonzero((labels == CRUISE) | (labels == WOT))
+    if driving.size:
+        tail = labels[driving[-1] + 1:]
+        tail[(tail == IDLE) | (tail == OFF)] = COOLDOWN
+    return labels
+
+def segment(times: np.ndarray, columns: Dict[str, np.ndarray],
+            thresholds: Thresholds = Thresholds()) -> List[dict]:
+    """segments with per-segment stats"""
+    if len(times) == 0:
+        return []
+    labels = classify(times, columns, thresholds)
+    starts = _run_starts(labels)
+    ends = np.r_[starts[1:], len(times)]
+    counts = ends - starts
+
+    stats = {}
+    for channel in STATS:
+        values = columns[channel]
+        valid = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        n_valid = np.add.reduceat(valid.astype(int), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats[channel] = {
+                'mean': np.where(n_valid > 0, sums / np.maximum(n_valid, 1), np.nan),
+                'min': np.fmin.reduceat(values, starts),
+                'max': np.fmax.reduceat(values, starts),
+            }
+
+    # segment ends at the next segment's start so durations add up
+    end_times = np.r_[times[starts[1:]], times[-1]]
+    segments = []
+    for i, start in enumerate(starts):
+        entry = {
+            'phase': PHASES[labels[start]],
+            'start': round(float(times[start]), 3),
+            'end': round(float(end_times[i]), 3),
+            'duration': round(float(end_times[i] - times[start]), 3),
+            'samples': int(counts[i]),
+        }
+        for channel, channel_stats in STATS.items():
+            for stat in channel_stats:
+                value = float(stats[channel][stat][i])
+                entry[f'{channel}_{stat}'] = None if value != value else round(value, 1)
+        segments.append(entry)
+    return segments
+
+def index_path(csv_path: Path) -> Path:
+    return csv_path.with_name(csv_path.stem + INDEX_SUFFIX)
+
+def index_session(csv_path: Path, thresholds: Thresholds = Thresholds()) -> dict:
+    """segment one session and write its index"""
+    csv_path = Path(csv_path)
+    times, columns = load_session(csv_path, CHANNELS)
+    index = {
+        'version': INDEX_VERSION,
+        'session': csv_path.stem,
+        'source_mtime': csv_path.stat().st_mtime,
+        'created': time.time(),
+        'thresholds': asdict(thresholds),
+        'duration': round(float(times[-1] - times[0]), 3) if len(times) else 0.0,
+        'segments': segment(times, columns, thresholds),
+    }
+    path = index_path(csv_path)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+    tmp.replace(path)
+    return index
+
+def _is_stale(csv_path: Path) -> bool:
+    path = index_path(csv_path)
+    return not path.exists() or path.stat().st_mtime < csv_path.stat().st_mtime
+
+def stale_sessions(log_directory: str, force: bool = False) -> List[Path]:
+    """CSV logs without an up-to-date index (all of them with force)"""
+    return [csv_path for csv_path in sorted(Path(log_directory).glob('*.csv'))
+            if force or _is_stale(csv_path)]
+
+def reindex(log_directory: str, force: bool = False,
+            thresholds: Thresholds = Thresholds()) -> List[str]:
+    """index every session without an up-to-date index, returns indexed names"""
+    indexed = []
+    for csv_path in stale_sessions(log_directory, force):
+        try:
+            index_session(csv_path, thresholds)
+            indexed.append(csv_path.stem)
+        except Exception as e:
+            # one bad log must not stop the rest from being indexed
+            print(f"[WARNING] Could not segment {csv_path.name}: {e}")
+    return indexed
+
+class SegmentIndex:
+    """in-memory view of all segment indexes, reloaded when files change"""
+
+    def __init__(self, log_directory: str):
+        self.log_directory = Path(log_directory)
+        self._cache: Dict[Path, tuple] = {}  # path -> (mtime, index)
+
+    def load(self) -> List[dict]:
+        indexes = []
+        seen = set()
+        for path in self.log_directory.glob('*' + INDEX_SUFFIX):
+            seen.add(path)
+            mtime = path.stat().st_mtime
+            cached = self._cache.get(path)
+            if cached is None or cached[0] != mtime:
+                try:
+                    with open(path) as f:
+                        cached = (mtime, json.load(f))
+                except (OSError, ValueError):
+                    continue
+                self._cache[path] = cached
+            indexes.append(cached[1])
+        for path in set(self._cache) - seen:
+            del self._cache[path]
+        return indexes
+
+    def query(self, phase: Optional[str] = None, min_duration: Optional[float] = None,
+              max_duration: Optional[float] = None, session: Optional[str] = None,
+              where: Sequence[str] = (), limit: int = 1000) -> List[dict]:
+        """matching segments across all sessions
+
+        where: conditions on segment stats, e.g. 'oil_temp_max>110'
+        """
+        if phase is not None and phase not in PHASES:
+            raise ValueError(f"Invalid phase {phase!r}, expected one of {', '.join(PHASES)}")
+        conditions = [parse_event(w) for w in where]
+
+        results = []
+        for index in self.load():
+            if session and session not in index['session']:
+                continue
+            for seg in index['segments']:
+                if phase and seg['phase'] != phase:
+                    continue
+                if min_duration is not None and seg['duration'] < min_duration:
+                    continue
+                if max_duration is not None and seg['duration'] > max_duration:
+                    continue
+                if not all(_matches(seg, c) for c in conditions):
+                    continue
+                results.append({'session': index['session'], **seg})
+        results.sort(key=lambda s: (s['session'], s['start']))
+        return results[:limit]
+
+def _matches(seg: dict, condition) -> bool:
+    field, op, threshold = condition
+    if field not in seg:
+        raise ValueError(f"Unknown segment field {field!r}")
+    value = seg[field]
+    if value is None:
+        return False
+    return {'>': value > threshold, '>=': value >= threshold,
+            '<': value < threshold, '<=': value <= threshold}[op]
+
+def main():
+    parser = argparse.ArgumentParser(description='Build drive-phase indexes for logged sessions')
+    parser.add_argument('--logs', default='../data/logs', help='log directory')
+    parser.add_argument('--force', action='store_true', help='rebuild up-to-date indexes too')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    indexed = reindex(args.logs, args.force)
+    print(f"[OK] Indexed {len(indexed)} sessions in {time.perf_counter() - started:.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+Session comparison: load two logged sessions, align them in time and
+resample both onto a common time base for overlay plots.
+
+Alignment modes
+  start           both sessions start at t = 0
+  event           t = 0 at the first sample matching a condition,
+                  e.g. 'throttle_position>80' (first full-throttle pull)
+  throttle_xcorr  shift b by the lag that maximises the cross-correlation
+                  of the two throttle traces (FFT based)
+"""
+
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+ALIGN_MODES = ('start', 'event', 'throttle_xcorr')
+DEFAULT_CHANNELS = ('coolant_temp', 'oil_temp', 'oil_pressure', 'throttle_position')
+DEFAULT_EVENT = 'throttle_position>80'
+
+_SESSION_NAME = re.compile(r'^[\w.-]+$')
+_EVENT = re.compile(r'^\s*(\w+)\s*(>=|<=|>|<)\s*(-?[\d.]+)\s*$')
+
+class SessionNotFound(LookupError):
+    """no such session in the log directory"""
+
+def list_sessions(log_directory: str) -> List[dict]:
+    """logged sessions, newest first"""
+    sessions = []
+    for path in Path(log_directory).glob('*.csv'):
+        stat = path.stat()
+        sessions.append({'name': path.stem, 'size': stat.st_size, 'modified': stat.st_mtime})
+    return sorted(sessions, key=lambda s: s['modified'], reverse=True)
+
+def session_path(log_directory: str, name: str) -> Path:
+    """resolve a session name (CSV file stem) inside the log directory"""
+    if not name or not _SESSION_NAME.match(name):
+        raise ValueError(f"Invalid session name: {name!r}")
+    path = Path(log_directory) / f"{name}.csv"
+    if not path.is_file():
+        raise SessionNotFound(f"Session not found: {name}")
+    return path
+
+def session_channels(path: Path) -> List[str]:
+    """channel names from the CSV header"""
+    with open(path) as f:
+        return [c.strip() for c in f.readline().split(',')[1:]]
+
+def stitch_resets(times: np.ndarray) -> np.ndarray:
+    """make timestamps monotonic across clock resets
+
+    A reconnect resets the Arduino and restarts millis() mid-session; each
+    later run is shifted to continue one sample step after the previous one.
+    """
+    steps = np.diff(times)
+    resets = np.flatnonzero(steps < 0)
+    if not resets.size:
+        return times
+    forward = steps[steps > 0]
+    dt = float(np.median(forward)) if forward.size else 0.0
+    jumps = np.zeros(len(steps))
+    jumps[resets] = dt - steps[resets]
+    return times + np.r_[0.0, np.cumsum(jumps)]
+
+@lru_cache(maxsize=32)
+def _load(path: str, mtime: float, channels: Tuple[str, ...]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    frame = pd.read_csv(path, usecols=('timestamp',) + channels, dtype='float64', engine='c')
+    frame = frame.dropna(subset=['timestamp'])
+    times = stitch_resets(frame['timestamp'].to_numpy())
+    return times, {c: frame[c].to_numpy() for c in channels}
+
+def load_session(path: Path, channels: Sequence[str]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """timestamps and the requested channels only, cached until the file changes
+
+    Clock resets inside the file are stitched (see stitch_resets), so times
+    always increase.
+    """
+    available = session_channels(path)
+    missing = [c for c in channels if c not in available]
+    if missing:
+        raise ValueError(f"{path.stem} has no channel(s): {', '.join(missing)}")
+    return _load(str(path), path.stat().st_mtime, tuple(channels))
+
+def parse_event(event: str) -> Tuple[str, str, float]:
+    match = _EVENT.match(event or '')
+    if not match:
+        raise ValueError(f"Invalid event {event!r}, expected e.g. 'throttle_position>80'")
+    return match.group(1), match.group(2), float(match.group(3))
+
+def event_time(times: np.ndarray, values: np.ndarray, op: str, threshold: float) -> float:
+    """time of the first sample matching the condition"""
+    with np.errstate(invalid='ignore'):
+        hit = {'>': values > threshold, '>=': values >= threshold,
+               '<': values < threshold, '<=': values <= threshold}[op]
+    if not hit.any():
+        raise ValueError(f"Event {op}{threshold} never occurs")
+    return float(times[np.argmax(hit)])
+
+def resample(times: np.ndarray, values: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """linear interpolation onto grid, ignoring missing samples"""
+    valid = ~np.isnan(values)
+    if valid.sum() < 2:
+        return np.full(grid.shape, np.nan)
+    t, v = times[valid], values[valid]
+    out = np.interp(grid, t, v)
+    out[(grid < t[0]) | (grid > t[-1])] = np.nan
+    return out
+
+def xcorr_lag(a: np.ndarray, b: np.ndarray, min_overlap: float = 0.25) -> int:
+    """lag k (samples) maximising sum a[i + k] * b[i], via FFT
+
+    Each lag is normalised by its overlap length; lags overlapping less
+    than min_overlap of the shorter trace are ignored.
+    """
+    a = np.nan_to_num(a - np.nanmean(a))
+    b = np.nan_to_num(b - np.nanmean(b))
+    n = len(a) + len(b) - 1
+    nfft = 1 << (n - 1).bit_length()
+    corr = np.fft.irfft(np.fft.rfft(a, nfft) * np.conj(np.fft.rfft(b, nfft)), nfft)
+
+    lags = np.concatenate((np.arange(0, len(a)), np.arange(-(len(b) - 1), 0)))
+    values = np.concatenate((corr[:len(a)], corr[nfft - (len(b) - 1):]))
+    overlap = np.where(lags >= 0, np.minimum(len(a) - lags, len(b)),
+                       np.minimum(len(b) + lags, len(a)))
+    score = np.where(overlap >= min_overlap * min(len(a), len(b)),
+                     values / np.maximum(overlap, 1), -np.inf)
+    return int(lags[np.argmax(score)])
+
+@lru_cache(maxsize=64)
+def _alignment(path_a: str, mtime_a: float, path_b: str, mtime_b: float,
+               align: str, event: str, rate_hz: float) -> Tuple[float, float]:
+    """reference times (t = 0) for a and b"""
+    if align == 'start':
+        ta, _ = _load(path_a, mtime_a, ())
+        tb, _ = _load(path_b, mtime_b, ())
+        return float(ta[0]), float(tb[0])
+
+    if align == 'event':
+        channel, op, threshold = parse_event(event)
+        ta, ca = _load(path_a, mtime_a, (channel,))
+        tb, cb = _load(path_b, mtime_b, (channel,))
+        return (event_time(ta, ca[channel], op, threshold),
+                event_time(tb, cb[channel], op, threshold))
+
+    # throttle_xcorr
+    ta, ca = _load(path_a, mtime_a, ('throttle_position',))
+    tb, cb = _load(path_b, mtime_b, ('throttle_position',))
+    dt = 1.0 / rate_hz
+    grid_a = np.arange(ta[0], ta[-1], dt)
+    grid_b = np.arange(tb[0], tb[-1], dt)
+    lag = xcorr_lag(resample(ta, ca['throttle_position'], grid_a),
+                    resample(tb, cb['throttle_position'], grid_b))
+    # a at (start_a + lag * dt) lines up with b at start_b
+    return float(ta[0] + lag * dt), float(tb[0])
+
+def downsample(values: np.ndarray, points: int) -> np.ndarray:
+    """bucket means, so the overlay stays smooth at any session length"""
+    if len(values) <= points:
+        return values
+    edges = np.linspace(0, len(values), points + 1).astype(int)[:-1]
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), edges)
+    counts = np.add.reduceat(valid.astype(int), edges)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+def _to_list(values: np.ndarray) -> list:
+    """JSON-safe list, NaN as None"""
+    return [None if v != v else v for v in np.round(values, 3).tolist()]
+
+def compare_sessions(log_directory: str, name_a: str, name_b: str, align: str = 'start',
+                     channels: Sequence[str] = DEFAULT_CHANNELS, event: str = DEFAULT_EVENT,
+                     rate_hz: float = 10.0, points: int = 1000) -> dict:
+    """overlay two sessions on a common, aligned time base"""
+    if align not in ALIGN_MODES:
+        raise ValueError(f"Invalid align {align!r}, expected one of {', '.join(ALIGN_MODES)}")
+    if align != 'event':
+        event = ''
+    points = max(10, min(points, 10000))
+
+    path_a = session_path(log_directory, name_a)
+    path_b = session_path(log_directory, name_b)
+    ta, ca = load_session(path_a, channels)
+    tb, cb = load_session(path_b, channels)
+    if len(ta) < 2 or len(tb) < 2:
+        raise ValueError("Sessions need at least two samples")
+
+    ref_a, ref_b = _alignment(str(path_a), path_a.stat().st_mtime,
+                              str(path_b), path_b.stat().st_mtime, align, event, rate_hz)
+
+    # common time base over the overlap of both sessions
+    start = max(ta[0] - ref_a, tb[0] - ref_b)
+    end = min(ta[-1] - ref_a, tb[-1] - ref_b)
+    if end <= start:
+        raise ValueError("Sessions do not overlap after alignment")
+    grid = np.arange(start, end, 1.0 / rate_hz)
+
+    result = {}
+    for channel in channels:
+        a = resample(ta - ref_a, ca[channel], grid)
+        b = resample(tb - ref_b, cb[channel], grid)
+        delta = b - a
+        with np.errstate(invalid='ignore'):
+            stats = {
+                'delta_mean': float(np.nanmean(delta)) if np.isfinite(delta).any() else None,
+                'delta_max_abs': float(np.nanmax(np.abs(delta))) if np.isfinite(delta).any() else None
+            }
+        result[channel] = {
+            'a': _to_list(downsample(a, points)),
+            'b': _to_list(downsample(b, points)),
+            'delta': _to_list(downsample(delta, points)),
+            **stats
+        }
+
+    return {
+        'a': name_a,
+        'b': name_b,
+        'align': align,
+        'event': event or None,
+        'offset': round((ref_b - tb[0]) - (ref_a - ta[0]), 3),  # b shift relative to start alignment
+        'duration': round(float(end - start), 3),
+        'time': _to_list(downsample(grid, points)),
+        'channels': result
+    }
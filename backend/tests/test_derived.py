@@ -0,0 +1,88 @@
+"""Derived channels must give the same output however the stream is batched"""
+
+import numpy as np
+import pytest
+
+from derived import DerivedChannelError, DerivedChannels
+
+CHANNELS = ('coolant_temp', 'oil_temp', 'oil_pressure', 'throttle_position')
+
+DEFINITIONS = {
+    'coolant_rate': 'ddt(ema(coolant_temp, 3))',
+    'oil_coolant_delta': 'oil_temp - coolant_temp',
+    'coolant_time_over': 'integrate(coolant_temp > 100.0)',
+    'pressure_per_throttle': 'oil_pressure / max(throttle_position, 1)',
+    'oil_rate': 'ddt(oil_temp)',
+    'pressure_smooth': 'ema(oil_pressure, 0.5)',
+}
+
+def make_stream(n=5000, seed=1):
+    rng = np.random.default_rng(seed)
+    times = np.cumsum(rng.uniform(0.05, 0.15, n))  # uneven spacing
+    columns = {c: 100.0 + np.cumsum(rng.normal(0, 1, n)) for c in CHANNELS}
+    for c in CHANNELS:
+        columns[c][rng.integers(0, n, 30)] = np.nan  # missing readings
+    return times, columns
+
+@pytest.mark.parametrize('batch_sizes', ['single', 'ones', 'random'])
+def test_batching_does_not_change_output(batch_sizes):
+    derived = DerivedChannels(DEFINITIONS, CHANNELS)
+    times, columns = make_stream(2000 if batch_sizes == 'ones' else 5000)
+    n = len(times)
+    expected = derived.evaluator().evaluate(times, columns)
+
+    if batch_sizes == 'single':
+        cuts = [0, n]
+    elif batch_sizes == 'ones':
+        cuts = list(range(n + 1))
+    else:
+        rng = np.random.default_rng(2)
+        cuts = [0] + sorted(rng.choice(np.arange(1, n), 300, replace=False).tolist()) + [n]
+
+    evaluator = derived.evaluator()
+    parts = {name: [] for name in derived.names}
+    for a, b in zip(cuts, cuts[1:]):
+        result = evaluator.evaluate(times[a:b], {c: v[a:b] for c, v in columns.items()})
+        for name in derived.names:
+            parts[name].append(result[name])
+
+    for name in derived.names:
+        np.testing.assert_allclose(np.concatenate(parts[name]), expected[name],
+                                   rtol=1e-9, atol=1e-9, equal_nan=True)
+
+def test_restart_resets_state():
+    derived = DerivedChannels({'total': 'integrate(coolant_temp)',
+                               'rate': 'ddt(coolant_temp)'}, CHANNELS)
+    evaluator = derived.evaluator()
+    evaluator.evaluate(np.arange(10.0), {'coolant_temp': np.full(10, 100.0)})
+    result = evaluator.evaluate(np.arange(3.0), {'coolant_temp': np.full(3, 20.0)})
+    np.testing.assert_array_equal(result['total'], [0.0, 20.0, 40.0])
+    np.testing.assert_array_equal(result['rate'], [np.nan, 0.0, 0.0])
+
+def test_division_by_zero_is_missing():
+    derived = DerivedChannels({'ratio': 'oil_pressure / throttle_position'}, CHANNELS)
+    result = derived.evaluator().evaluate(
+        np.array([0.0, 0.1]), {'oil_pressure': np.array([40.0, 40.0]),
+                               'throttle_position': np.array([0.0, 10.0])})
+    np.testing.assert_array_equal(result['ratio'], [np.nan, 4.0])
+
+@pytest.mark.parametrize('expression', [
+    "__import__('os').system('true')",
+    'coolant_temp.real',
+    'coolant_temp[0]',
+    'lambda: 1',
+    'rpm * 2',
+    'abs(coolant_temp, oil_temp)',
+    'ema(coolant_temp)',
+    'clip(coolant_temp, 0)',
+    'ddt(x=coolant_temp)',
+    "'text'",
+    'coolant_temp +',
+])
+def test_invalid_expression(expression):
+    with pytest.raises(DerivedChannelError):
+        DerivedChannels({'bad': expression}, CHANNELS)
+
+def test_duplicate_channel():
+    with pytest.raises(DerivedChannelError):
+        DerivedChannels({'oil_temp': 'coolant_temp * 2'}, CHANNELS)
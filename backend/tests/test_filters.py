@@ -0,0 +1,81 @@
+"""Filter chains must give the same output however the stream is batched"""
+
+import numpy as np
+import pytest
+
+from filters import ChannelFilters, FilterConfigError, _Filter
+
+CHANNELS = ('coolant_temp', 'oil_temp', 'oil_pressure', 'throttle_position')
+
+CONFIG = {
+    'oil_pressure': [{'type': 'median', 'n': 5},
+                     {'type': 'kalman', 'process_noise': 20.0, 'measurement_noise': 2.0}],
+    'coolant_temp': [{'type': 'iir', 'tau': 2.0}],
+    'oil_temp': [{'type': 'moving_average', 'window': 10}],
+    'throttle_position': [{'type': 'median', 'n': 3}],
+}
+
+def make_stream(n=5000, seed=1):
+    rng = np.random.default_rng(seed)
+    times = np.cumsum(rng.uniform(0.05, 0.15, n))  # uneven spacing
+    columns = {c: np.cumsum(rng.normal(0, 1, n)) + rng.normal(0, 2, n) for c in CHANNELS}
+    columns['oil_pressure'][rng.integers(0, n, 50)] += 40.0  # ignition spikes
+    for c in CHANNELS:
+        columns[c][rng.integers(0, n, 30)] = np.nan  # missing readings
+    return times, columns
+
+@pytest.mark.parametrize('batch_sizes', ['single', 'ones', 'random'])
+def test_batching_does_not_change_output(batch_sizes):
+    filters = ChannelFilters(CONFIG, CHANNELS)
+    times, columns = make_stream(2000 if batch_sizes == 'ones' else 5000)
+    n = len(times)
+    expected = filters.pipeline().apply(times, columns)
+
+    if batch_sizes == 'single':
+        cuts = [0, n]
+    elif batch_sizes == 'ones':
+        cuts = list(range(n + 1))
+    else:
+        rng = np.random.default_rng(2)
+        cuts = [0] + sorted(rng.choice(np.arange(1, n), 300, replace=False).tolist()) + [n]
+
+    pipeline = filters.pipeline()
+    parts = {name: [] for name in filters.names}
+    for a, b in zip(cuts, cuts[1:]):
+        result = pipeline.apply(times[a:b], {c: v[a:b] for c, v in columns.items()})
+        for name in filters.names:
+            parts[name].append(result[name])
+
+    for name in filters.names:
+        np.testing.assert_allclose(np.concatenate(parts[name]), expected[name],
+                                   rtol=1e-9, atol=1e-9, equal_nan=True)
+
+def test_median_rejects_spikes():
+    filters = ChannelFilters({'oil_pressure': [{'type': 'median', 'n': 5}]}, CHANNELS)
+    times = np.arange(20) * 0.1
+    pressure = np.full(20, 40.0)
+    pressure[10] = 90.0
+    result = filters.pipeline().apply(times, {'oil_pressure': pressure})
+    np.testing.assert_array_equal(result['oil_pressure_filtered'], np.full(20, 40.0))
+
+def test_restart_resets_state():
+    filters = ChannelFilters({'coolant_temp': [{'type': 'iir', 'tau': 5.0}]}, CHANNELS)
+    pipeline = filters.pipeline()
+    pipeline.apply(np.arange(10.0), {'coolant_temp': np.full(10, 100.0)})
+    result = pipeline.apply(np.arange(3.0), {'coolant_temp': np.full(3, 20.0)})
+    np.testing.assert_array_equal(result['coolant_temp_filtered'], np.full(3, 20.0))
+
+@pytest.mark.parametrize('config', [
+    {'rpm': [{'type': 'median', 'n': 3}]},
+    {'oil_temp': [{'type': 'lowpass'}]},
+    {'oil_temp': [{'type': 'median', 'n': 0}]},
+    {'oil_temp': [{'type': 'iir', 'alpha': 0.5}]},
+    {'oil_temp': [{'type': 'kalman', 'process_noise': 1.0, 'measurement_noise': -1.0}]},
+])
+def test_invalid_config(config):
+    with pytest.raises(FilterConfigError):
+        ChannelFilters(config, CHANNELS)
+
+def test_filter_base_is_abstract():
+    with pytest.raises(TypeError):
+        _Filter()
@@ -0,0 +1,164 @@
+"""Loopback tests for the network ingest link"""
+
+import socket
+import threading
+import time
+
+import eventlet
+import pytest
+
+from ingest_client import IngestClient
+from ingest_protocol import ACK, FrameDecoder, encode_ack, encode_data, encode_hello
+from ingest_server import IngestServer
+
+def make_batch(start, n=5):
+    return [(float(start + i), 90.0, 100.0, 40.0, 20.0) for i in range(n)]
+
+@pytest.fixture
+def server():
+    """IngestServer on an ephemeral port, with its own hub in a thread"""
+    received = []
+    failures = {'remaining': 0}
+
+    def callback(vehicle_id, samples):
+        if failures['remaining']:
+            failures['remaining'] -= 1
+            raise RuntimeError('callback failed')
+        received.extend((vehicle_id, s.timestamp) for s in samples)
+
+    srv = IngestServer('127.0.0.1', 0, callback)
+    started = threading.Event()
+    stop = threading.Event()
+
+    def run():
+        srv.start()
+        started.set()
+        while not stop.is_set():
+            eventlet.sleep(0.005)
+        srv.stop()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert started.wait(5)
+    srv.received = received
+    srv.failures = failures
+    yield srv
+    stop.set()
+    thread.join(timeout=2)
+
+def read_acks(sock, timeout=2.0):
+    """ack frames until the server closes the connection or goes quiet"""
+    sock.settimeout(timeout)
+    decoder = FrameDecoder()
+    acks = []
+    closed = False
+    try:
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                closed = True
+                break
+            acks.extend(f.seq for f in decoder.feed(data) if f.kind == ACK)
+            sock.settimeout(0.2)
+    except socket.timeout:
+        pass
+    return acks, closed
+
+def test_decoder_handles_partial_frames():
+    frames = [encode_hello('car1', 0)] + \
+             [encode_data('car1', seq, make_batch(seq * 10, seq)) for seq in range(1, 6)] + \
+             [encode_ack('car1', 5)]
+    stream = b''.join(frames)
+
+    decoder = FrameDecoder()
+    decoded = []
+    for i in range(0, len(stream), 7):  # split across and inside headers
+        decoded.extend(decoder.feed(stream[i:i + 7]))
+
+    assert [f.seq for f in decoded] == [0, 1, 2, 3, 4, 5, 5]
+    assert [len(f.samples) for f in decoded if f.samples] == [1, 2, 3, 4, 5]
+    assert decoded[3].samples[0][0] == 30.0
+    assert decoder.feed(b'') == []
+
+def test_duplicates_are_dropped(server):
+    with socket.create_connection(('127.0.0.1', server.port)) as sock:
+        frames = [encode_data('car1', seq, make_batch(seq * 10)) for seq in range(1, 4)]
+        sock.sendall(b''.join(frames))
+        acks, _ = read_acks(sock)
+        assert acks[-1] == 3
+        sock.sendall(b''.join(frames))  # resent after a lost ack
+        acks, closed = read_acks(sock)
+        assert acks[-1] == 3 and not closed
+
+    assert len(server.received) == 15
+    assert server.status()['car1']['duplicates'] == 3
+
+def test_reconnect_resends_without_duplicates(server, monkeypatch):
+    client = IngestClient('127.0.0.1', server.port, 'car1')
+    assert client.connect()
+
+    # the server gets every batch but the client never sees the acks
+    monkeypatch.setattr(client, '_read_acks', lambda block: None)
+    for seq in range(10):
+        client.send_batch(make_batch(seq * 10))
+    time.sleep(0.2)
+    client.close()
+    monkeypatch.undo()
+    assert len(client.pending) == 10
+
+    for seq in range(10, 20):
+        client.send_batch(make_batch(seq * 10))
+    assert client.flush(timeout=5)
+    client.close()
+
+    timestamps = [t for _, t in server.received]
+    assert timestamps == [float(seq * 10 + i) for seq in range(20) for i in range(5)]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+@pytest.mark.parametrize('first_run', [5, 2])
+def test_restarted_client_renumbers_queued_batches(server, first_run):
+    client = IngestClient('127.0.0.1', server.port, 'car1')
+    for seq in range(first_run):
+        client.send_batch(make_batch(seq * 10))
+    assert client.flush(timeout=5)
+    client.close()
+
+    # the logger restarts and queues batches while the server is unreachable
+    client = IngestClient('127.0.0.1', free_port(), 'car1')
+    for seq in range(first_run, first_run + 3):
+        client.send_batch(make_batch(seq * 10))
+    assert len(client.pending) == 3
+
+    client.port = server.port
+    assert client.flush(timeout=5)
+    client.close()
+
+    timestamps = [t for _, t in server.received]
+    assert timestamps == [float(seq * 10 + i) for seq in range(first_run + 3) for i in range(5)]
+    assert server.status()['car1']['acked_seq'] == first_run + 3
+    assert client.next_seq == first_run + 4
+
+def test_gap_closes_connection(server):
+    with socket.create_connection(('127.0.0.1', server.port)) as sock:
+        sock.sendall(encode_data('car1', 1, make_batch(0)) + encode_data('car1', 3, make_batch(30)))
+        acks, closed = read_acks(sock)
+    assert acks == [1]
+    assert closed  # client has to reconnect and resend from 1
+    assert len(server.received) == 5
+
+def test_callback_failure_is_resent(server):
+    server.failures['remaining'] = 1
+    client = IngestClient('127.0.0.1', server.port, 'car1', resend_after=0.5)
+    assert client.connect()
+    for seq in range(40):
+        client.send_batch(make_batch(seq * 10))
+    assert client.flush(timeout=10)
+    client.close()
+
+    timestamps = [t for _, t in server.received]
+    assert timestamps == [float(seq * 10 + i) for seq in range(40) for i in range(5)]
+    assert server.status()['car1']['acked_seq'] == 40
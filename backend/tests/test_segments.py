@@ -0,0 +1,34 @@
+"""Segmentation and session loading on awkward logs"""
+
+import numpy as np
+
+import segments
+from session_compare import load_session
+
+HEADER = 'timestamp,coolant_temp,oil_temp,oil_pressure,throttle_position\n'
+
+def write_session(path, times, throttle):
+    rows = ''.join(f'{t},90,100,40,{p}\n' for t, p in zip(times, throttle))
+    path.write_text(HEADER + rows)
+
+def test_clock_reset_is_stitched(tmp_path):
+    # millis() restarts after a reconnect: 0..9.9 s, then 0..9.9 s again
+    times = np.r_[np.arange(100) * 0.1, np.arange(100) * 0.1]
+    throttle = np.r_[np.full(100, 20.0), np.full(50, 95.0), np.full(50, 20.0)]
+    path = tmp_path / 'reset.csv'
+    write_session(path, np.round(times, 1), throttle)
+
+    loaded, _ = load_session(path, ('throttle_position',))
+    assert np.all(np.diff(loaded) > 0)
+    assert np.isclose(loaded[100], loaded[99] + 0.1)
+
+    index = segments.index_session(path)
+    assert all(seg['duration'] >= 0 for seg in index['segments'])
+    assert [seg['phase'] for seg in index['segments']] == ['cruise', 'wot', 'cruise']
+
+def test_duplicate_timestamps_do_not_abort_reindex(tmp_path):
+    write_session(tmp_path / 'dup.csv', np.zeros(50), np.full(50, 20.0))
+    write_session(tmp_path / 'ok.csv', np.arange(50) * 0.1, np.full(50, 20.0))
+
+    assert segments.reindex(str(tmp_path)) == ['dup', 'ok']
+    assert {s['session'] for s in segments.SegmentIndex(str(tmp_path)).query()} == {'dup', 'ok'}
@@ -0,0 +1,41 @@
+"""Cross-correlation alignment must recover a known time shift"""
+
+import numpy as np
+import pytest
+
+from session_compare import compare_sessions, xcorr_lag
+
+HEADER = 'timestamp,coolant_temp,oil_temp,oil_pressure,throttle_position\n'
+
+def make_throttle(n=6000, seed=1):
+    """random throttle steps, 10 Hz"""
+    rng = np.random.default_rng(seed)
+    levels = rng.uniform(0, 100, n // 50 + 1)
+    steps = np.repeat(levels, 50)[:n]
+    return np.clip(steps + rng.normal(0, 2, n), 0, 100)
+
+def write_session(path, throttle):
+    times = np.arange(len(throttle)) * 0.1
+    rows = ''.join(f'{t:.1f},90,100,40,{p:.1f}\n' for t, p in zip(times, throttle))
+    path.write_text(HEADER + rows)
+
+@pytest.mark.parametrize('shift', [300, -300])
+def test_xcorr_recovers_shift(tmp_path, shift):
+    throttle = make_throttle()
+    # b starts `shift` samples into a (negative: a starts into b)
+    a, b = (throttle, throttle[shift:]) if shift > 0 else (throttle[-shift:], throttle)
+    write_session(tmp_path / 'a.csv', a)
+    write_session(tmp_path / 'b.csv', b)
+
+    result = compare_sessions(str(tmp_path), 'a', 'b', align='throttle_xcorr',
+                              channels=('throttle_position',))
+    assert result['offset'] == pytest.approx(-shift * 0.1, abs=1e-6)
+    assert result['channels']['throttle_position']['delta_max_abs'] == pytest.approx(0.0, abs=1e-6)
+
+def test_xcorr_lag_sign():
+    # a[i + k] == b[i] at the returned lag k
+    rng = np.random.default_rng(3)
+    pulse = rng.uniform(0, 100, 200)
+    a = np.r_[np.full(400, 50.0), pulse, np.full(400, 50.0)]
+    assert xcorr_lag(a, pulse) == 400
+    assert xcorr_lag(pulse, a) == -400
@@ -1,6 +1,97 @@
 // Chart.js configuration and initialization
-let tempChart, pressureChart, throttleChart;
-const MAX_DATA_POINTS = 100; // Keep last 100 data points
+let tempChart, pressureChart, throttleChart, derivedChart;
+
+// Samples are buffered in typed-array rings and drawn at most once per frame
+const CHART_WINDOW_OPTIONS = [60, 300, 600, 1800]; // seconds
+let chartWindowSeconds = 600; // visible window (10 min)
+const MAX_SAMPLE_RATE_HZ = 50; // sizes the ring buffers
+const BUFFER_CAPACITY = Math.max(...CHART_WINDOW_OPTIONS) * MAX_SAMPLE_RATE_HZ;
+
+// Fixed-size ring of samples: Float64 timestamps, one Float32 array per channel
+class SampleBuffer {
+    constructor(channels, capacity) {
+        this.channels = channels;
+        this.capacity = capacity;
+        this.times = new Float64Array(capacity);
+        this.values = {};
+        channels.forEach(name => {
+            this.values[name] = new Float32Array(capacity);
+        });
+        this.start = 0;
+        this.length = 0;
+    }
+
+    push(data) {
+        let index;
+        if (this.length < this.capacity) {
+            index = (this.start + this.length) % this.capacity;
+            this.length++;
+        } else {
+            index = this.start;
+            this.start = (this.start + 1) % this.capacity;
+        }
+        this.times[index] = data.timestamp;
+        this.channels.forEach(name => {
+            const value = data[name];
+            this.values[name][index] = (value === null || value === undefined) ? NaN : value;
+        });
+    }
+
+    // Append n samples from column arrays (binary frames)
+    pushColumns(times, columns, n) {
+        for (let i = 0; i < n; i++) {
+            let index;
+            if (this.length < this.capacity) {
+                index = (this.start + this.length) % this.capacity;
+                this.length++;
+            } else {
+                index = this.start;
+                this.start = (this.start + 1) % this.capacity;
+            }
+            this.times[index] = times[i];
+            this.channels.forEach(name => {
+                const column = columns[name];
+                this.values[name][index] = column ? column[i] : NaN;
+            });
+        }
+    }
+
+    // Logical position i (0 = oldest) to physical array index
+    index(i) {
+        return (this.start + i) % this.capacity;
+    }
+
+    // First logical position with time >= t (timestamps are increasing)
+    lowerBound(t) {
+        let lo = 0, hi = this.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if (this.times[this.index(mid)] < t) lo = mid + 1;
+            else hi = mid;
+        }
+        return lo;
+    }
+
+    latestTime() {
+        return this.length ? this.times[this.index(this.length - 1)] : 0;
+    }
+
+    clear() {
+        this.start = 0;
+        this.length = 0;
+    }
+}
+
+const SENSOR_CHANNELS = ['coolant_temp', 'oil_temp', 'oil_pressure', 'throttle_position'];
+let sampleBuffer = new SampleBuffer(SENSOR_CHANNELS, BUFFER_CAPACITY);
+
+const DERIVED_COLORS = ['#1a1a1a', '#666', '#999', '#bbb'];
+const FILTERED_SUFFIX = '_filtered';
+
+// chart -> channel per dataset
+const chartChannels = new Map();
+let derivedAxisTemplate = null;  // y axis options, copied per derived unit
+let renderScheduled = false;
 
 // Initialize charts when page loads
 document.addEventListener('DOMContentLoaded', () => {
@@ -13,6 +104,16 @@ function initCharts() {
         responsive: true,
         maintainAspectRatio: false,
         animation: false,
+        parsing: false,
+        normalized: true,
+        elements: {
+            point: {
+                radius: 0
+            },
+            line: {
+                tension: 0
+            }
+        },
         plugins: {
             legend: {
                 display: true,
@@ -72,16 +173,14 @@ function initCharts() {
                     data: [],
                     borderColor: '#1a1a1a',
                     backgroundColor: 'rgba(26, 26, 26, 0.1)',
-                    borderWidth: 1.5,
-                    tension: 0.4
+                    borderWidth: 1.5
                 },
                 {
                     label: 'Oil Temp (°C)',
                     data: [],
                     borderColor: '#666',
                     backgroundColor: 'rgba(102, 102, 102, 0.1)',
-                    borderWidth: 1.5,
-                    tension: 0.4
+                    borderWidth: 1.5
                 }
             ]
         },
@@ -89,6 +188,7 @@ function initCharts() {
             ...commonOptions,
             scales: {
                 ...commonOptions.scales,
+                x: { ...commonOptions.scales.x },
                 y: {
                     ...commonOptions.scales.y,
                     title: {
@@ -114,14 +214,14 @@ function initCharts() {
                 data: [],
                 borderColor: '#1a1a1a',
                 backgroundColor: 'rgba(26, 26, 26, 0.1)',
-                borderWidth: 1.5,
-                tension: 0.4
+                borderWidth: 1.5
             }]
         },
         options: {
             ...commonOptions,
             scales: {
                 ...commonOptions.scales,
+                x: { ...commonOptions.scales.x },
                 y: {
                     ...commonOptions.scales.y,
                     title: {
@@ -147,14 +247,14 @@ function initCharts() {
                 data: [],
                 borderColor: '#1a1a1a',
                 backgroundColor: 'rgba(26, 26, 26, 0.1)',
-                borderWidth: 1.5,
-                tension: 0.4
+                borderWidth: 1.5
             }]
         },
         options: {
             ...commonOptions,
             scales: {
                 ...commonOptions.scales,
+                x: { ...commonOptions.scales.x },
                 y: {
                     ...commonOptions.scales.y,
                     min: 0,
@@ -171,45 +271,205 @@ function initCharts() {
             }
         }
     });
+
+    // Derived channels chart, datasets are added from the server schema
+    const derivedCtx = document.getElementById('derivedChart').getContext('2d');
+    derivedChart = new Chart(derivedCtx, {
+        type: 'line',
+        data: {
+            datasets: []
+        },
+        options: {
+            ...commonOptions,
+            scales: {
+                ...commonOptions.scales,
+                x: { ...commonOptions.scales.x }
+            }
+        }
+    });
+
+    derivedAxisTemplate = commonOptions.scales.y;
+    
+    chartChannels.set(tempChart, ['coolant_temp', 'oil_temp']);
+    chartChannels.set(pressureChart, ['oil_pressure']);
+    chartChannels.set(throttleChart, ['throttle_position']);
+    chartChannels.set(derivedChart, []);
+}
+
+// Use the server's channel list (sensor, filtered and derived channels)
+function configureChannels(channels, units = {}) {
+    const same = channels.length === sampleBuffer.channels.length &&
+        channels.every((name, i) => name === sampleBuffer.channels[i]);
+    if (same) return;
+    
+    sampleBuffer = new SampleBuffer(channels, BUFFER_CAPACITY);
+    
+    // Filtered sensor channels are drawn dashed over their raw trace
+    const filtered = channels.filter(name => name.endsWith(FILTERED_SUFFIX) &&
+        SENSOR_CHANNELS.includes(name.slice(0, -FILTERED_SUFFIX.length)));
+    [tempChart, pressureChart, throttleChart].forEach(chart => {
+        const raw = chartChannels.get(chart).filter(name => SENSOR_CHANNELS.includes(name));
+        const base = chart.data.datasets.slice(0, raw.length);
+        const overlays = raw.filter(name => filtered.includes(name + FILTERED_SUFFIX));
+        chart.data.datasets = base.concat(overlays.map(name => {
+            const source = base[raw.indexOf(name)];
+            return {
+                label: source.label.replace(' (', ' filtered ('),
+                data: [],
+                borderColor: source.borderColor,
+                borderDash: [6, 3],
+                borderWidth: 2
+            };
+        }));
+        chartChannels.set(chart, raw.concat(overlays.map(name => name + FILTERED_SUFFIX)));
+        chart.update('none');
+    });
+    
+    const derived = channels.filter(name => !SENSOR_CHANNELS.includes(name) && !filtered.includes(name));
+    
+    // One y axis per unit, so e.g. °C/s rates aren't flattened by growing time-over totals
+    const unitOf = name => units[name] || '';
+    const unitGroups = [...new Set(derived.map(unitOf))];
+    const scales = { x: derivedChart.config.options.scales.x };  // raw options, not the resolver proxy
+    unitGroups.forEach((unit, i) => {
+        scales[`y${i}`] = {
+            ...derivedAxisTemplate,
+            position: i % 2 ? 'right' : 'left',
+            grid: { ...derivedAxisTemplate.grid, drawOnChartArea: i === 0 },
+            title: { display: unit !== '', text: unit, color: '#999', font: { size: 10 } }
+        };
+    });
+    derivedChart.config.options.scales = scales;
+    
+    derivedChart.data.datasets = derived.map((name, i) => ({
+        label: unitOf(name) ? `${name.replace(/_/g, ' ')} (${unitOf(name)})` : name.replace(/_/g, ' '),
+        data: [],
+        yAxisID: `y${unitGroups.indexOf(unitOf(name))}`,
+        borderColor: DERIVED_COLORS[i % DERIVED_COLORS.length],
+        borderDash: i < DERIVED_COLORS.length ? [] : [4, 3],
+        borderWidth: 1.5
+    }));
+    chartChannels.set(derivedChart, derived);
+    derivedChart.update('none');
 }
 
 // Update charts with new data
 function updateCharts(data) {
     if (!data || !data.timestamp) return;
     
-    const timestamp = data.timestamp;
-    
-    // Update temperature chart
-    if (data.coolant_temp !== null && data.coolant_temp !== undefined) {
-        addDataPoint(tempChart, 0, timestamp, data.coolant_temp);
+    // Restarted stream (e.g. new session), drop the old trace
+    if (sampleBuffer.length && data.timestamp < sampleBuffer.latestTime()) {
+        sampleBuffer.clear();
     }
-    if (data.oil_temp !== null && data.oil_temp !== undefined) {
-        addDataPoint(tempChart, 1, timestamp, data.oil_temp);
+    sampleBuffer.push(data);
+    scheduleRender();
+}
+
+// Binary frame: float64 timestamps then one float32 column per schema channel
+function decodeFrame(frame, schema) {
+    const buffer = frame instanceof ArrayBuffer
+        ? frame
+        : frame.buffer.slice(frame.byteOffset, frame.byteOffset + frame.byteLength);
+    const channelCount = schema.channels.length;
+    const n = buffer.byteLength / (8 + 4 * channelCount);
+    const times = new Float64Array(buffer, 0, n);
+    const columns = {};
+    schema.channels.forEach((name, k) => {
+        columns[name] = new Float32Array(buffer, 8 * n + 4 * n * k, n);
+    });
+    return { n, times, columns };
+}
+
+// Update charts from a decoded binary frame
+function updateChartsFromFrame(decoded) {
+    if (!decoded.n) return;
+    if (sampleBuffer.length && decoded.times[0] < sampleBuffer.latestTime()) {
+        sampleBuffer.clear();
     }
+    sampleBuffer.pushColumns(decoded.times, decoded.columns, decoded.n);
+    scheduleRender();
+}
+
+function setChartWindow(seconds) {
+    chartWindowSeconds = seconds;
+    scheduleRender();
+}
+
+function scheduleRender() {
+    if (renderScheduled) return;
+    renderScheduled = true;
+    requestAnimationFrame(renderCharts);
+}
+
+// Redraw the visible chart from the ring buffer
+function renderCharts() {
+    renderScheduled = false;
+    if (!sampleBuffer.length) return;
     
-    // Update pressure chart
-    if (data.oil_pressure !== null && data.oil_pressure !== undefined) {
-        addDataPoint(pressureChart, 0, timestamp, data.oil_pressure);
-    }
+    const tEnd = sampleBuffer.latestTime();
+    const tStart = tEnd - chartWindowSeconds;
+    const first = sampleBuffer.lowerBound(tStart);
     
-    // Update throttle chart
-    if (data.throttle_position !== null && data.throttle_position !== undefined) {
-        addDataPoint(throttleChart, 0, timestamp, data.throttle_position);
-    }
+    chartChannels.forEach((channels, chart) => {
+        // Hidden tabs are drawn when they are shown
+        if (!chart.canvas.offsetParent) return;
+        
+        const width = Math.max(1, Math.floor(chart.chartArea ? chart.chartArea.width : chart.width));
+        channels.forEach((name, datasetIndex) => {
+            chart.data.datasets[datasetIndex].data = decimateMinMax(
+                sampleBuffer, name, first, tStart, tEnd, width);
+        });
+        chart.options.scales.x.min = Math.max(tStart, sampleBuffer.times[sampleBuffer.index(first)]);
+        chart.options.scales.x.max = tEnd;
+        chart.update('none');
+    });
 }
 
-// Helper to add data point and maintain max length
-function addDataPoint(chart, datasetIndex, x, y) {
-    const dataset = chart.data.datasets[datasetIndex];
+// Keep the min and max of each pixel column so spikes survive decimation
+function decimateMinMax(buffer, name, first, tStart, tEnd, buckets) {
+    const values = buffer.values[name];
+    const times = buffer.times;
+    const count = buffer.length - first;
+    const points = [];
     
-    // Add new point
-    dataset.data.push({ x, y });
-    
-    // Remove old points if exceeding max
-    if (dataset.data.length > MAX_DATA_POINTS) {
-        dataset.data.shift();
+    if (count <= buckets * 2) {
+        for (let i = first; i < buffer.length; i++) {
+            const j = buffer.index(i);
+            if (!Number.isNaN(values[j])) points.push({ x: times[j], y: values[j] });
+        }
+        return points;
     }
     
-    // Update chart
-    chart.update('none'); // 'none' mode for performance (no animation)
-}
\ No newline at end of file
+    const bucketWidth = (tEnd - tStart) / buckets;
+    let bucket = -1;
+    let minJ = -1, maxJ = -1;
+    
+    const flush = () => {
+        if (minJ < 0) return;
+        if (minJ === maxJ) {
+            points.push({ x: times[minJ], y: values[minJ] });
+        } else if (times[minJ] < times[maxJ]) {
+            points.push({ x: times[minJ], y: values[minJ] }, { x: times[maxJ], y: values[maxJ] });
+        } else {
+            points.push({ x: times[maxJ], y: values[maxJ] }, { x: times[minJ], y: values[minJ] });
+        }
+    };
+    
+    for (let i = first; i < buffer.length; i++) {
+        const j = buffer.index(i);
+        const v = values[j];
+        if (Number.isNaN(v)) continue;
+        
+        const b = Math.min(buckets - 1, Math.floor((times[j] - tStart) / bucketWidth));
+        if (b !== bucket) {
+            flush();
+            bucket = b;
+            minJ = maxJ = j;
+        } else {
+            if (v < values[minJ]) minJ = j;
+            if (v > values[maxJ]) maxJ = j;
+        }
+    }
+    flush();
+    return points;
+}
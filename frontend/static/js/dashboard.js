@@ -15,6 +15,8 @@ const logMessages = document.getElementById('logMessages');
 
 // State
 let isLogging = false;
+let streamSchema = null; // set when the server offers binary frames
+const vehicleId = new URLSearchParams(window.location.search).get('vehicle'); // remote logger, e.g. ?vehicle=car1
 let systemStatus = {
     connected: false,
     streaming: false,
@@ -46,14 +48,32 @@ function initChartTabs() {
             // Update active chart container
             containers.forEach(c => c.classList.remove('active'));
             document.querySelector(`[data-chart-content="${chartType}"]`).classList.add('active');
+            scheduleRender();
         });
     });
+    
+    // Visible window selector
+    const windowSelect = document.getElementById('chartWindow');
+    CHART_WINDOW_OPTIONS.forEach(seconds => {
+        const option = document.createElement('option');
+        option.value = seconds;
+        option.textContent = seconds < 120 ? `${seconds} s` : `${seconds / 60} min`;
+        option.selected = seconds === chartWindowSeconds;
+        windowSelect.appendChild(option);
+    });
+    windowSelect.addEventListener('change', () => {
+        setChartWindow(Number(windowSelect.value));
+    });
 }
 
 // Socket events
 socket.on('connect', () => {
     console.log('Socket connected!');
     addLog('WebSocket connected', 'success');
+    if (vehicleId) {
+        socket.emit('join_vehicle', vehicleId);
+        addLog(`Watching vehicle: ${vehicleId}`, 'info');
+    }
 });
 
 socket.on('disconnect', () => {
@@ -67,14 +87,39 @@ socket.on('status', (status) => {
     updateUI();
 });
 
+// Server announces its channel layout; switch to packed binary frames
+socket.on('schema', (schema) => {
+    if (schema.channels) configureChannels(schema.channels, schema.units);
+    if (!schema.formats || !schema.formats.includes('binary')) return;
+    streamSchema = schema;
+    socket.emit('set_format', 'binary');
+});
+
+// Local serial stream, ignored while watching a remote vehicle (different time base)
+socket.on('sensor_frame', (frame) => {
+    if (streamSchema && !vehicleId) handleFrame(frame);
+});
+
 socket.on('sensor_data', (data) => {
-    console.log('Sensor data received:', data);
-    updateGauges(data);
+    if (vehicleId) return;
     updateCharts(data);
+    queueGaugeUpdate(data);
+});
+
+socket.on('sensor_batch', (batch) => {
+    if (batch.vehicle_id !== vehicleId) return;
+    if (batch.frame) {
+        if (streamSchema) handleFrame(batch.frame);
+        return;
+    }
+    if (!batch.samples.length) return;
+    batch.samples.forEach(updateCharts);
+    queueGaugeUpdate(batch.samples[batch.samples.length - 1]);
 });
 
-// Debug: catch all events
+// Debug: catch all events (data events are too frequent to log)
 socket.onAny((eventName, ...args) => {
+    if (eventName === 'sensor_data' || eventName === 'sensor_frame' || eventName === 'sensor_batch') return;
     console.log(`[Socket Event] ${eventName}:`, args);
 });
 
@@ -132,6 +177,34 @@ logBtn.addEventListener('click', async () => {
 });
 
 // Update functions
+let pendingGaugeData = null;
+
+// Gauges show the latest sample, so only draw once per frame
+function queueGaugeUpdate(data) {
+    if (pendingGaugeData === null) {
+        requestAnimationFrame(() => {
+            updateGauges(pendingGaugeData);
+            pendingGaugeData = null;
+        });
+    }
+    pendingGaugeData = data;
+}
+
+function handleFrame(frame) {
+    const decoded = decodeFrame(frame, streamSchema);
+    if (!decoded.n) return;
+    updateChartsFromFrame(decoded);
+    
+    // Gauges only need the newest sample
+    const last = decoded.n - 1;
+    const latest = { timestamp: decoded.times[last] };
+    streamSchema.channels.forEach(name => {
+        const value = decoded.columns[name][last];
+        latest[name] = Number.isNaN(value) ? null : value;
+    });
+    queueGaugeUpdate(latest);
+}
+
 function updateGauges(data) {
     // Coolant temperature
     const coolantElem = document.getElementById('coolantTemp');
@@ -0,0 +1,97 @@
+"""
+Payload Benchmark
+Compares JSON and packed binary sensor payloads (wire bytes and encode/decode CPU),
+for the raw sensor channels and for the full live stream (filtered + derived channels)
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+from socketio import packet
+
+import payloads
+from config import Config
+from derived import DerivedChannels
+from filters import ChannelFilters
+from serial_handler import SensorData
+
+# same channel layout as app.STREAM_CHANNELS
+channel_filters = ChannelFilters(Config.FILTERS, payloads.CHANNELS)
+derived_channels = DerivedChannels(Config.DERIVED_CHANNELS, payloads.CHANNELS + channel_filters.names)
+STREAM_CHANNELS = payloads.CHANNELS + channel_filters.names + derived_channels.names
+
+def make_samples(n):
+    return [SensorData(timestamp=1234.5 + i * 0.1, coolant_temp=88.4, oil_temp=96.1,
+                       oil_pressure=42.7, throttle_position=18.0) for i in range(n)]
+
+def wire_bytes(event, data):
+    """encoded Socket.IO packet size, text part plus binary attachments"""
+    encoded = packet.Packet(packet.EVENT, data=[event, data]).encode()
+    if isinstance(encoded, list):
+        return len(encoded[0].encode()) + sum(len(part) for part in encoded[1:])
+    return len(encoded.encode())
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+def make_columns(batch):
+    """sensor, filtered and derived columns, computed like app.process_batch"""
+    times, columns = payloads.columns_from_samples(make_samples(batch))
+    columns.update(channel_filters.pipeline().apply(times, columns))
+    columns.update(derived_channels.evaluator().evaluate(times, columns))
+    return times, columns
+
+def bench(batch, channels):
+    times, columns = make_columns(batch)
+    repeat = max(200, 20000 // batch)
+
+    if batch == 1:
+        json_event, json_data = 'sensor_data', payloads.to_json(times, columns, channels)[0]
+        bin_event, bin_data = 'sensor_frame', payloads.pack_frame(times, columns, channels)
+        encode_json = lambda: packet.Packet(packet.EVENT, data=[
+            'sensor_data', payloads.to_json(times, columns, channels)[0]]).encode()
+        encode_bin = lambda: packet.Packet(packet.EVENT, data=[
+            'sensor_frame', payloads.pack_frame(times, columns, channels)]).encode()
+    else:
+        json_event, json_data = 'sensor_batch', {'vehicle_id': 'car1', 'samples': payloads.to_json(times, columns, channels)}
+        bin_event, bin_data = 'sensor_batch', {'vehicle_id': 'car1', 'frame': payloads.pack_frame(times, columns, channels)}
+        encode_json = lambda: packet.Packet(packet.EVENT, data=[
+            'sensor_batch', {'vehicle_id': 'car1', 'samples': payloads.to_json(times, columns, channels)}]).encode()
+        encode_bin = lambda: packet.Packet(packet.EVENT, data=[
+            'sensor_batch', {'vehicle_id': 'car1', 'frame': payloads.pack_frame(times, columns, channels)}]).encode()
+
+    text = json.dumps(json_data)
+    frame = payloads.pack_frame(times, columns, channels)
+
+    return {
+        'batch': batch,
+        'json_bytes': wire_bytes(json_event, json_data) / batch,
+        'binary_bytes': wire_bytes(bin_event, bin_data) / batch,
+        'json_encode_us': timed(encode_json, repeat) / batch * 1e6,
+        'binary_encode_us': timed(encode_bin, repeat) / batch * 1e6,
+        'json_decode_us': timed(lambda: json.loads(text), repeat) / batch * 1e6,
+        'binary_decode_us': timed(lambda: payloads.unpack_frame(frame, channels), repeat) / batch * 1e6,
+    }
+
+def main():
+    for label, channels in (('raw sensor channels', payloads.CHANNELS),
+                            ('live stream (STREAM_CHANNELS)', STREAM_CHANNELS)):
+        print(f"\n{label}: {len(channels)} channels")
+        print(f"{'batch':>6} | {'bytes/sample':^17} | {'encode us/sample':^17} | {'decode us/sample':^17}")
+        print(f"{'':>6} | {'json':>8} {'binary':>8} | {'json':>8} {'binary':>8} | {'json':>8} {'binary':>8}")
+        print("-" * 64)
+        for batch in (1, 10, 100, 1000):
+            r = bench(batch, channels)
+            print(f"{r['batch']:>6} | {r['json_bytes']:>8.1f} {r['binary_bytes']:>8.1f} | "
+                  f"{r['json_encode_us']:>8.2f} {r['binary_encode_us']:>8.2f} | "
+                  f"{r['json_decode_us']:>8.2f} {r['binary_decode_us']:>8.2f}")
+
+if __name__ == '__main__':
+    main()